@@ -13,8 +13,15 @@ const Matches = () => {
   const fetchMatches = async () => {
     try {
       setLoading(true);
-      const response = await datingAPI.getMatches();
-      setMatches(response.data);
+      // Matches are cursor-paginated; keep following X-Next-Cursor until the last page
+      let all = [];
+      let cursor = null;
+      do {
+        const response = await datingAPI.getMatches(cursor);
+        all = all.concat(response.data);
+        cursor = response.headers['x-next-cursor'] || null;
+      } while (cursor);
+      setMatches(all);
     } catch (error) {
       console.error('Error fetching matches:', error);
     } finally {
@@ -22,16 +29,6 @@ const Matches = () => {
     }
   };
 
-  // Helper function to get the other user from a match
-  const getMatchUser = (match, currentUserId) => {
-    return match.user1.id === currentUserId ? match.user2 : match.user1;
-  };
-
-  // Get current user ID from localStorage
-  const getCurrentUserId = () => {
-    const user = JSON.parse(localStorage.getItem('user') || '{}');
-    return user.id;
-  };
 
   if (loading) {
     return (
@@ -63,7 +60,7 @@ const Matches = () => {
           transition={{ staggerChildren: 0.1 }}
         >
           {matches.map((match, index) => {
-            const matchUser = getMatchUser(match, getCurrentUserId());
+            const matchUser = match.user; // the server only sends the other person
             
             return (
               <motion.div
@@ -87,7 +87,9 @@ const SwipeCard = () => {
     setExitDirection(direction);
     
     try {
-      const response = await datingAPI.interact(targetUserId, action);
+      // We already hold the rest of the feed batch; only ask for `next` on the last card
+      const wantNext = currentIndex + 1 >= users.length;
+      const response = await datingAPI.interact(targetUserId, action, wantNext);
       
       if (response.data.matched) {
         setMatchedUser(users[currentIndex]);
@@ -53,9 +53,10 @@ export const datingAPI = {
     headers: getAuthHeaders(),
   }),
   
-  interact: (targetUserId, interactionType) => axios.post(`${BASE_URL}/dating/swipe/`, {
+  interact: (targetUserId, interactionType, wantNext = true) => axios.post(`${BASE_URL}/dating/swipe/`, {
     target_id: targetUserId,
     action: interactionType, // 'like' or 'pass'
+    next: wantNext, // only ask for a suggestion when the local card window runs out
   }, {
     headers: {
       ...getAuthHeaders(),
@@ -63,8 +64,9 @@ export const datingAPI = {
     },
   }),
   
-  getMatches: () => axios.get(`${BASE_URL}/dating/matches/`, {
+  getMatches: (cursor = null) => axios.get(`${BASE_URL}/dating/matches/`, {
     headers: getAuthHeaders(),
+    params: cursor ? { cursor } : {},
   }),
 };
 
@@ -1,11 +1,20 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
+from .authentication import bump_profile_version
 from .models import User
 
 @admin.register(User)
 class UserAdmin(DjangoUserAdmin):
     fieldsets = DjangoUserAdmin.fieldsets + (
         ("Profile", {"fields": ("bio","gender","birth_date","cover_image_url","likes")}),
+        ("Feed preferences", {"fields": ("min_age_pref","max_age_pref")}),
     )
     list_display = ("username","email","gender","is_staff")
 
+    def save_model(self, request, obj, form, change):
+        if change:
+            obj.profile_version += 1
+        super().save_model(request, obj, form, change)
+        if change:
+            bump_profile_version(obj)   # retire the claims in the user's current access tokens
+
@@ -0,0 +1,192 @@
+# accounts/authentication.py
+"""
+JWT authentication without a per-request user query.
+
+Access tokens carry the profile fields the hot views filter on (CLAIM_FIELDS)
+plus the user's profile_version. ClaimsJWTAuthentication turns those claims
+into a User instance with every other field deferred: feed, swipe and matches
+never touch the user table for authentication. Reading any other field (likes,
+email, is_staff, ...) fills all of them at once from a small in-process LRU
+cache of user rows (UserCache, USER_CACHE_SIZE rows for USER_CACHE_TTL seconds).
+
+Staleness: bump_profile_version() (MeView calls it on every update) records the
+new version in the shared cache for as long as an access token lives. A token
+whose version differs is not trusted; that request loads the user from the DB,
+and the next token refresh stamps the new claims. Tokens issued before claims
+existed take the same DB path.
+
+Revocation: deleting or deactivating a user (accounts.signals) calls revoke(),
+which leaves a marker in the same cache for one access-token lifetime; tokens
+of a revoked user get a 401. The version and the marker are read together, in
+one get_many. Deactivating with QuerySet.update() bypasses the signal: call
+revoke() yourself.
+
+All of this needs a cache every worker shares: on a process-local LocMemCache
+a delete or profile change in one process (another worker, a management
+command) never reaches the others. There, claims are not trusted and every
+request loads the user from the DB, as plain JWTAuthentication does, unless
+CLAIMS_AUTH["ALLOW_LOCAL"] is set.
+"""
+import threading, time
+from collections import OrderedDict
+from datetime import date
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from datingapp.sharedcache import is_shared
+
+User = get_user_model()
+
+CLAIM_FIELDS = ("gender", "birth_date", "min_age_pref", "max_age_pref")
+VERSION_CLAIM = "ver"
+AUTH_DEFAULTS = {"USER_CACHE_SIZE": 10000, "USER_CACHE_TTL": 30, "ALLOW_LOCAL": False}
+
+def conf():
+    return {**AUTH_DEFAULTS, **getattr(settings, "CLAIMS_AUTH", {})}
+
+def _version_key(user_id):
+    return f"auth:ver:{user_id}"
+
+class UserCache:
+    """Thread-safe LRU of full User rows, each trusted for `ttl` seconds."""
+    def __init__(self, size, ttl):
+        self.size, self.ttl = size, ttl
+        self.rows = OrderedDict()   # user id -> (expires, user)
+        self.lock = threading.Lock()
+
+    def get(self, user_id, min_version=0):
+        now = time.monotonic()
+        with self.lock:
+            hit = self.rows.get(user_id)
+            if hit and hit[0] > now and hit[1].profile_version >= min_version:
+                self.rows.move_to_end(user_id)
+                return hit[1]
+        user = User.objects.filter(pk=user_id).first()
+        if user is not None:
+            self.put(user)
+        return user
+
+    def put(self, user):
+        with self.lock:
+            self.rows[user.pk] = (time.monotonic() + self.ttl, user)
+            self.rows.move_to_end(user.pk)
+            while len(self.rows) > self.size:
+                self.rows.popitem(last=False)
+
+    def discard(self, user_id):
+        with self.lock:
+            self.rows.pop(user_id, None)
+
+# Rows for the few views that need more than the token claims
+_user_cache = None
+_user_cache_lock = threading.Lock()
+
+def user_cache():
+    global _user_cache
+    with _user_cache_lock:
+        if _user_cache is None:
+            _user_cache = UserCache(conf()["USER_CACHE_SIZE"], conf()["USER_CACHE_TTL"])
+    return _user_cache
+
+def _revoked_key(user_id):
+    return f"auth:revoked:{user_id}"
+
+def _token_seconds():
+    return int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+
+def bump_profile_version(user):
+    """Call after saving a profile change that claims or cached rows depend on."""
+    cache.set(_version_key(user.pk), user.profile_version, _token_seconds())
+    user_cache().discard(user.pk)
+
+def revoke(*user_ids):
+    """Stop accepting the access tokens of `user_ids` (deleted or deactivated users)."""
+    if user_ids:
+        cache.set_many({_revoked_key(uid): 1 for uid in user_ids}, _token_seconds())
+        for uid in user_ids:
+            user_cache().discard(uid)
+
+def unrevoke(user_id):
+    cache.delete(_revoked_key(user_id))
+
+def add_claims(token, user):
+    for field in CLAIM_FIELDS:
+        value = getattr(user, field)
+        token[field] = value.isoformat() if isinstance(value, date) else value
+    token[VERSION_CLAIM] = user.profile_version
+    return token
+
+def tokens_for(user):
+    """A refresh token for `user` whose access tokens carry the profile claims."""
+    return add_claims(RefreshToken.for_user(user), user)
+
+def user_from_claims(token):
+    """A User with only the id and claim fields loaded (see User.refresh_from_db)."""
+    claims = {"id": token[api_settings.USER_ID_CLAIM], "profile_version": token[VERSION_CLAIM]}
+    claims.update((field, token[field]) for field in CLAIM_FIELDS)
+    # from_db() wants the values in model field order
+    fields = [f for f in User._meta.concrete_fields if f.attname in claims]
+    user = User.from_db("default", [f.attname for f in fields], [f.to_python(claims[f.attname]) for f in fields])
+    user._claims_only = True
+    return user
+
+def _stale(token, state):
+    """Whether `token`'s claims are out of date, given the cache `state` from _state_keys()."""
+    user_id = token.get(api_settings.USER_ID_CLAIM)
+    if _revoked_key(user_id) in state:
+        raise AuthenticationFailed("User not found or inactive", code="user_inactive")
+    current_version = state.get(_version_key(user_id))
+    return VERSION_CLAIM not in token or (current_version is not None and current_version != token[VERSION_CLAIM])
+
+def claims_trusted():
+    """Whether token claims may stand in for the user row (see the module docstring)."""
+    return conf()["ALLOW_LOCAL"] or is_shared()
+
+def _state_keys(token):
+    user_id = token.get(api_settings.USER_ID_CLAIM)
+    return [_version_key(user_id), _revoked_key(user_id)]
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that trusts the profile claims of a current, unrevoked token."""
+    def get_user(self, validated_token):
+        if not claims_trusted() or _stale(validated_token, cache.get_many(_state_keys(validated_token))):
+            return super().get_user(validated_token)
+        return user_from_claims(validated_token)
+
+    async def aget_user(self, validated_token):
+        """get_user() for async views: at most one async cache read, or one async query."""
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if claims_trusted() and not _stale(validated_token, await cache.aget_many(_state_keys(validated_token))):
+            return user_from_claims(validated_token)
+        user = await User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).afirst()
+        if user is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        if not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return user
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        return add_claims(super().get_token(user), user)
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refreshing re-reads the user, so a new access token never carries stale claims."""
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        refresh = RefreshToken(data.get("refresh", attrs["refresh"]))
+        user = User.objects.filter(pk=refresh[api_settings.USER_ID_CLAIM], is_active=True).first()
+        if user is None:
+            raise InvalidToken("User not found or inactive")
+        add_claims(refresh, user)
+        data["access"] = str(refresh.access_token)
+        if "refresh" in data:
+            data["refresh"] = str(refresh)
+        return data
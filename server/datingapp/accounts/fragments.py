@@ -0,0 +1,68 @@
+# accounts/fragments.py
+"""
+Pre-rendered public profiles: PublicUserSerializer output, cached per user.
+
+Feed and match pages show the same popular profiles over and over. Each
+fragment is cached under profile:<id> together with the profile_version and
+the day it was rendered (`age` moves on birthdays); a fragment whose version
+or day differs from the row at hand counts as a miss. A page fetches all its
+fragments with one get_many() and renders and stores (set_many) only the misses.
+
+User saves drop the fragment (accounts.signals). Code that changes public
+fields with QuerySet.update() must call invalidate() itself.
+"""
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import caches
+
+FRAGMENT_DEFAULTS = {
+    "CACHE": "default",   # cache alias holding the fragments
+    "TIMEOUT": 3600,      # seconds
+}
+
+def conf():
+    return {**FRAGMENT_DEFAULTS, **getattr(settings, "PROFILE_FRAGMENTS", {})}
+
+def _key(user_id):
+    return f"profile:{user_id}"
+
+def _ident(user):
+    if isinstance(user, dict):   # a .values() row
+        return user["id"], user["profile_version"]
+    return user.pk, user.profile_version
+
+def render_many(users, render):
+    """
+    Public profile dicts for `users` (User objects or .values() rows), in order,
+    from the cache where possible. `render(list_of_users)` produces the missing ones.
+    """
+    users = list(users)
+    if not users:
+        return []
+    cfg = conf()
+    cache = caches[cfg["CACHE"]]
+    today = date.today().isoformat()
+    idents = [_ident(user) for user in users]
+    cached = cache.get_many([_key(pk) for pk, _ in idents])
+
+    out, missing = [], []
+    for i, (pk, version) in enumerate(idents):
+        hit = cached.get(_key(pk))
+        if hit is not None and hit[0] == version and hit[1] == today:
+            out.append(hit[2])
+        else:
+            out.append(None)
+            missing.append(i)
+    if missing:
+        fresh = {}
+        for i, data in zip(missing, render([users[i] for i in missing])):
+            out[i] = data
+            pk, version = idents[i]
+            fresh[_key(pk)] = (version, today, data)
+        cache.set_many(fresh, cfg["TIMEOUT"])
+    return out
+
+def invalidate(*user_ids):
+    if user_ids:
+        caches[conf()["CACHE"]].delete_many([_key(pk) for pk in user_ids])
@@ -0,0 +1,110 @@
+# accounts/hashers.py
+"""
+Password hashing: tuned hashers plus a bounded worker pool to run them on.
+
+- TunedScryptPasswordHasher / TunedArgon2PasswordHasher take their cost from
+  settings.PASSWORD_HASHING. PASSWORD_HASHERS (settings) lists the preferred
+  one first; hashes made by any other listed hasher, or with another cost,
+  are upgraded on the user's next successful login (User.check_password).
+- hash_password() / check_password() (and the async ahash_password() /
+  acheck_password()) run the hashing on a small thread pool. hashlib and
+  argon2-cffi release the GIL, so hashes run in parallel up to WORKERS, and a
+  signup/login storm queues for at most QUEUE more slots instead of piling
+  hashes onto every request thread; past that, HashingBusy answers 503.
+Only the CPU work runs in the pool: the upgraded hash comes back to the caller,
+which saves it on its own thread (and database connection).
+"""
+import asyncio, os, threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework.exceptions import APIException
+
+HASHING_DEFAULTS = {
+    "SCRYPT_WORK_FACTOR": 2**15,   # N: 128 * N * r bytes = 32 MiB per hash
+    "SCRYPT_BLOCK_SIZE": 8,
+    "SCRYPT_PARALLELISM": 1,
+    "ARGON2_TIME_COST": 2,
+    "ARGON2_MEMORY_COST": 19456,   # KiB
+    "ARGON2_PARALLELISM": 1,
+    "WORKERS": os.cpu_count() or 1,   # concurrent hashes (0 = hash on the calling thread)
+    "QUEUE": 64,                      # hashes allowed to wait for a worker
+    "WAIT_SECONDS": 5,                # how long a sync caller waits for a queue slot
+}
+
+_executor = None
+_slots = None
+_executor_lock = threading.Lock()
+
+def conf():
+    return {**HASHING_DEFAULTS, **getattr(settings, "PASSWORD_HASHING", {})}
+
+class TunedScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    """Django's scrypt hasher ("scrypt$..." hashes) with the cost from settings."""
+    def __init__(self):
+        cost = conf()
+        self.work_factor = cost["SCRYPT_WORK_FACTOR"]
+        self.block_size = cost["SCRYPT_BLOCK_SIZE"]
+        self.parallelism = cost["SCRYPT_PARALLELISM"]
+        # OpenSSL refuses more than 32 MiB by default; leave room for older, costlier hashes
+        self.maxmem = max(256 * 2**20, 2 * 128 * self.work_factor * self.block_size * self.parallelism)
+
+class TunedArgon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """Argon2id ("argon2$..." hashes) with the cost from settings. Needs argon2-cffi."""
+    def __init__(self):
+        cost = conf()
+        self.time_cost = cost["ARGON2_TIME_COST"]
+        self.memory_cost = cost["ARGON2_MEMORY_COST"]
+        self.parallelism = cost["ARGON2_PARALLELISM"]
+
+class HashingBusy(APIException):
+    status_code = 503
+    default_detail = "Too many sign-ins in progress, try again shortly."
+    default_code = "hashing_busy"
+
+def _verify(password, encoded):
+    """(is_correct, new encoded hash or None): check_password's setter, captured."""
+    upgraded = []
+    is_correct = hashers.check_password(password, encoded, setter=lambda raw: upgraded.append(hashers.make_password(raw)))
+    return is_correct, (upgraded[0] if upgraded else None)
+
+def _pool():
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            cost = conf()
+            _executor = ThreadPoolExecutor(max_workers=cost["WORKERS"], thread_name_prefix="hashing")
+            _slots = threading.BoundedSemaphore(cost["WORKERS"] + cost["QUEUE"])
+    return _executor
+
+def _submit(blocking, fn, *args):
+    executor = _pool()
+    if not _slots.acquire(blocking, conf()["WAIT_SECONDS"] if blocking else None):
+        raise HashingBusy()
+    future = executor.submit(fn, *args)
+    future.add_done_callback(lambda f: _slots.release())
+    return future
+
+def hash_password(password):
+    """make_password() on the hashing pool."""
+    if password is None or not conf()["WORKERS"]:
+        return hashers.make_password(password)
+    return _submit(True, hashers.make_password, password).result()
+
+def check_password(password, encoded):
+    """(is_correct, upgraded hash or None) for `password` against `encoded`, on the hashing pool."""
+    if not conf()["WORKERS"]:
+        return _verify(password, encoded)
+    return _submit(True, _verify, password, encoded).result()
+
+async def ahash_password(password):
+    """hash_password() without blocking the event loop; HashingBusy at once if the queue is full."""
+    if password is None or not conf()["WORKERS"]:
+        return hashers.make_password(password)
+    return await asyncio.wrap_future(_submit(False, hashers.make_password, password))
+
+async def acheck_password(password, encoded):
+    if not conf()["WORKERS"]:
+        return _verify(password, encoded)
+    return await asyncio.wrap_future(_submit(False, _verify, password, encoded))
@@ -1,11 +1,24 @@
-from django.core.management.base import BaseCommand
+from datetime import datetime, time
+
+from django.contrib.admin.models import LogEntry
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
 from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+from accounts import authentication, fragments
+from accounts.models import SYNTHETIC_PREFIX as PREFIX, MediaRef, UserLike
+from dating import candidates
 from dating.models import Swipe, Match
 
 User = get_user_model()
 
+# Everything that points at a user, children first; User itself goes last
+USER_TABLES = [UserLike, MediaRef, Swipe, Match, User.groups.through, User.user_permissions.through, LogEntry]
+
 class Command(BaseCommand):
-    help = 'Clear all users, swipes, and matches from the database'
+    help = 'Clear all users, swipes, and matches from the database (or only synthetic / old data)'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -13,15 +26,42 @@ class Command(BaseCommand):
             action='store_true',
             help='Confirm deletion of all data',
         )
+        parser.add_argument(
+            '--synthetic',
+            action='store_true',
+            help=f'Only delete synthetic "{PREFIX}*" users and everything that references them',
+        )
+        parser.add_argument(
+            '--older-than',
+            metavar='YYYY-MM-DD',
+            help='Only delete swipes and matches created before this date',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50000,
+            help='Rows (by id range) per delete statement in selective mode (default 50000)',
+        )
 
     def handle(self, *args, **options):
+        selective = options['synthetic'] or options['older_than']
         if not options['confirm']:
-            self.stdout.write(
-                self.style.WARNING('This will delete ALL users, swipes, and matches!')
-            )
+            if selective:
+                self.stdout.write(self.style.WARNING('This will delete the selected users, swipes, and matches!'))
+            else:
+                self.stdout.write(
+                    self.style.WARNING('This will delete ALL users, swipes, and matches!')
+                )
             self.stdout.write('Run with --confirm to proceed: python manage.py clear_all_data --confirm')
             return
 
+        if selective:
+            self.purge_selected(options)
+        else:
+            self.purge_all()
+        self.stdout.write('Uploaded files are kept; run gc_media_blobs to remove the ones nobody references.')
+
+    def purge_all(self):
         # Count before deletion
         user_count = User.objects.count()
         swipe_count = Swipe.objects.count()
@@ -30,12 +70,84 @@ class Command(BaseCommand):
         self.stdout.write(f'Found {user_count} users, {swipe_count} swipes, {match_count} matches')
         self.stdout.write('Deleting all data...')
 
-        # Delete all data
-        Swipe.objects.all().delete()
-        Match.objects.all().delete()
-        User.objects.all().delete()
+        # One flush of every user table: TRUNCATE on PostgreSQL, DELETE FROM on
+        # SQLite. Nothing is loaded into Python, unlike Model.objects.all().delete()
+        ids = list(User.objects.values_list('id', flat=True).iterator(chunk_size=10000))
+        tables = [model._meta.db_table for model in USER_TABLES + [User]]
+        connection.ops.execute_sql_flush(connection.ops.sql_flush(no_style(), tables))
+        for start in range(0, len(ids), 10000):
+            self.forget(ids[start:start + 10000])
 
         self.stdout.write(
             self.style.SUCCESS('Successfully deleted all users, swipes, and matches!')
         )
         self.stdout.write('Database is now clean. You can run create_sample_data to add new users.')
+
+    def purge_selected(self, options):
+        batch = options['batch_size']
+        if batch < 1:
+            raise CommandError('--batch-size must be positive')
+
+        if options['older_than']:
+            try:
+                day = datetime.strptime(options['older_than'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--older-than must be a date like 2025-01-31')
+            cutoff = timezone.make_aware(datetime.combine(day, time.min))
+            self.stdout.write(f'Deleting swipes and matches created before {day}...')
+            swipes = self.delete_by_id_range(Swipe, Q(created_at__lt=cutoff), batch, 'swipes')
+            matches = self.delete_by_id_range(Match, Q(created_at__lt=cutoff), batch, 'matches')
+            self.stdout.write(self.style.SUCCESS(f'Deleted {swipes} swipes and {matches} matches'))
+
+        if options['synthetic']:
+            synthetic = Q(username__startswith=PREFIX)
+            self.stdout.write(f'Deleting synthetic "{PREFIX}*" users...')
+            # rows on either side of a synthetic user, in one pass over each table
+            swipes = self.delete_by_id_range(
+                Swipe, Q(user__username__startswith=PREFIX) | Q(target__username__startswith=PREFIX), batch, 'swipes'
+            )
+            matches = self.delete_by_id_range(
+                Match, Q(user1__username__startswith=PREFIX) | Q(user2__username__startswith=PREFIX), batch, 'matches'
+            )
+            users = 0
+            while True:
+                ids = list(User.objects.filter(synthetic).order_by('id').values_list('id', flat=True)[:batch])
+                if not ids:
+                    break
+                with transaction.atomic():
+                    for model in (UserLike, MediaRef, User.groups.through, User.user_permissions.through, LogEntry):
+                        qs = model.objects.filter(user_id__in=ids)
+                        qs._raw_delete(qs.db)
+                    qs = User.objects.filter(id__in=ids)
+                    users += qs._raw_delete(qs.db)
+                self.forget(ids)
+                self.stdout.write(f'  users: {users} deleted')
+            self.stdout.write(
+                self.style.SUCCESS(f'Deleted {users} synthetic users, {swipes} swipes and {matches} matches')
+            )
+
+    @staticmethod
+    def forget(ids):
+        """
+        What post_delete would have done for these users (raw deletes send no
+        signals): revoke their tokens, drop their fragments and queues.
+        """
+        authentication.revoke(*ids)
+        fragments.invalidate(*ids)
+        candidates.invalidate(*ids)
+
+    def delete_by_id_range(self, model, condition, batch, label):
+        """
+        Delete `model` rows matching `condition`, one id range at a time: each
+        statement touches at most `batch` ids and no row is loaded into Python.
+        """
+        bounds = model.objects.aggregate(lo=Min('id'), hi=Max('id'))
+        if bounds['lo'] is None:
+            return 0
+        deleted = 0
+        for start in range(bounds['lo'], bounds['hi'] + 1, batch):
+            qs = model.objects.filter(condition, id__gte=start, id__lt=start + batch)
+            deleted += qs._raw_delete(qs.db)
+            done = min(start + batch - bounds['lo'], bounds['hi'] - bounds['lo'] + 1)
+            self.stdout.write(f'  {label}: scanned {done}/{bounds["hi"] - bounds["lo"] + 1} ids, {deleted} deleted')
+        return deleted
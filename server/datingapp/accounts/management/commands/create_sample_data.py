@@ -1,5 +1,8 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from accounts.models import UserLike
 from datetime import date, timedelta
 import random
 
@@ -158,29 +161,33 @@ class Command(BaseCommand):
         ]
 
         self.stdout.write('Creating sample users...')
-        
-        created_count = 0
+
+        # One query for existing usernames, one hash per distinct password
+        # (they all share one), then a single bulk insert
+        existing = set(
+            User.objects.filter(username__in=[u['username'] for u in sample_users]).values_list('username', flat=True)
+        )
+        hashes = {}
+        new_users = []
         for user_data in sample_users:
-            # Check if user already exists
-            if User.objects.filter(username=user_data['username']).exists():
+            if user_data['username'] in existing:
                 self.stdout.write(f"User {user_data['username']} already exists, skipping...")
                 continue
-            
-            # Create user
-            user = User.objects.create_user(
-                username=user_data['username'],
-                email=user_data['email'],
-                password=user_data['password'],
-                first_name=user_data['first_name'],
-                last_name=user_data['last_name'],
-                bio=user_data['bio'],
-                gender=user_data['gender'],
-                birth_date=user_data['birth_date'],
-                likes=user_data['likes'],
-                cover_image_url=user_data['cover_image_url']
+            password = user_data.pop('password')
+            if password not in hashes:
+                hashes[password] = make_password(password)
+            new_users.append(User(password=hashes[password], **user_data))
+
+        with transaction.atomic():
+            User.objects.bulk_create(new_users)
+            # bulk_create skips the post_save signal that maintains the likes index
+            UserLike.objects.bulk_create(
+                [UserLike(user=user, token=token) for user in new_users for token in user.likes],
+                ignore_conflicts=True,
             )
-            created_count += 1
+        for user in new_users:
             self.stdout.write(f"Created user: {user.username}")
+        created_count = len(new_users)
 
         self.stdout.write(
             self.style.SUCCESS(f'Successfully created {created_count} sample users!')
@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from dating.models import Swipe, Match
 import random
 
@@ -9,8 +10,8 @@ class Command(BaseCommand):
     help = 'Create sample swipes and matches for testing'
 
     def handle(self, *args, **options):
-        users = list(User.objects.all())
-        
+        users = list(User.objects.values_list('id', 'username'))
+
         if len(users) < 4:
             self.stdout.write(
                 self.style.ERROR('Need at least 4 users to create sample interactions. Run create_sample_data first.')
@@ -18,75 +19,73 @@ class Command(BaseCommand):
             return
 
         self.stdout.write('Creating sample swipes and matches...')
-        
-        swipes_created = 0
-        matches_created = 0
-        
-        # Create some random swipes
+        names = dict(users)
+        ids = list(names)
+
+        # Create some random swipes (like/pass: 70% chance of like)
+        candidates = {}
         for i in range(20):
-            user1 = random.choice(users)
-            user2 = random.choice(users)
-            
+            user1 = random.choice(ids)
+            user2 = random.choice(ids)
+
             # Don't swipe on yourself
-            if user1.id == user2.id:
-                continue
-                
-            # Don't create duplicate swipes
-            if Swipe.objects.filter(user=user1, target=user2).exists():
-                continue
-            
-            # Random like/pass (70% chance of like)
-            is_like = random.random() < 0.7
-            
-            Swipe.objects.create(
-                user=user1,
-                target=user2,
-                is_like=is_like
-            )
-            swipes_created += 1
-            
-            # If this was a like, check if the target also liked back
-            if is_like and Swipe.objects.filter(user=user2, target=user1, is_like=True).exists():
-                # Create a match if it doesn't exist
-                try:
-                    match = Match.create_sorted(user1, user2)
-                    matches_created += 1
-                    self.stdout.write(f"Created match between {user1.username} and {user2.username}")
-                except:
-                    pass  # Match might already exist
-        
-        # Create some guaranteed matches for testing
+            if user1 != user2:
+                candidates.setdefault((user1, user2), random.random() < 0.7)
+
+        # Create some guaranteed matches for testing (mutual likes)
         guaranteed_matches = [
             ('alex_smith', 'emma_johnson'),
             ('mike_wilson', 'sarah_davis'),
             ('chris_brown', 'lisa_taylor'),
         ]
-        
+        by_name = {username: user_id for user_id, username in users}
+        guaranteed = set()
         for username1, username2 in guaranteed_matches:
-            try:
-                user1 = User.objects.get(username=username1)
-                user2 = User.objects.get(username=username2)
-                
-                # Create mutual likes
-                Swipe.objects.get_or_create(
-                    user=user1, target=user2,
-                    defaults={'is_like': True}
-                )
-                Swipe.objects.get_or_create(
-                    user=user2, target=user1,
-                    defaults={'is_like': True}
-                )
-                
-                # Create match
-                match = Match.create_sorted(user1, user2)
-                matches_created += 1
-                self.stdout.write(f"Created guaranteed match: {username1} ❤️ {username2}")
-                
-            except User.DoesNotExist:
+            if username1 not in by_name or username2 not in by_name:
                 self.stdout.write(f"Users {username1} or {username2} not found")
                 continue
-            except:
-                pass  # Match might already exist
+            user1, user2 = by_name[username1], by_name[username2]
+            candidates.setdefault((user1, user2), True)
+            candidates.setdefault((user2, user1), True)
+            guaranteed.add((min(user1, user2), max(user1, user2)))
+
+        # One query for the existing swipes and matches among the users involved;
+        # duplicates are dropped in memory instead of one exists() per swipe
+        involved = {user_id for pair in candidates for user_id in pair}
+        swipes = {
+            (user_id, target_id): is_like
+            for user_id, target_id, is_like in Swipe.objects.filter(
+                user_id__in=involved, target_id__in=involved
+            ).values_list('user_id', 'target_id', 'is_like')
+        }
+        new_swipes = {pair: like for pair, like in candidates.items() if pair not in swipes}
+        swipes.update(new_swipes)
+
+        # Every like that is now returned becomes a match
+        pairs = {
+            (min(a, b), max(a, b)) for (a, b), like in new_swipes.items() if like and swipes.get((b, a))
+        }
+        pairs |= guaranteed
+        existing_matches = set(
+            Match.objects.filter(user1_id__in=involved, user2_id__in=involved).values_list('user1_id', 'user2_id')
+        )
+        new_matches = sorted(pairs - existing_matches)
+
+        with transaction.atomic():
+            Swipe.objects.bulk_create(
+                [Swipe(user_id=a, target_id=b, is_like=like) for (a, b), like in new_swipes.items()],
+                ignore_conflicts=True,
+            )
+            Match.objects.bulk_create(
+                [Match(user1_id=a, user2_id=b) for a, b in new_matches], ignore_conflicts=True
+            )
+        for a, b in new_matches:
+            if (a, b) in guaranteed:
+                self.stdout.write(f"Created guaranteed match: {names[a]} ❤️ {names[b]}")
+            else:
+                self.stdout.write(f"Created match between {names[a]} and {names[b]}")
+        swipes_created = len(new_swipes)
+        matches_created = len(new_matches)
 
         self.stdout.write(
             self.style.SUCCESS(f'Successfully created {swipes_created} swipes and {matches_created} matches!')
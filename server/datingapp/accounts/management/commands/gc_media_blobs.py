@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from accounts.media import conf, variant_path
+from accounts.models import MediaBlob, MediaRef
+
+class Command(BaseCommand):
+    help = 'Delete stored uploads (and their WebP variants) that no user references any more'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+        parser.add_argument(
+            '--grace-minutes',
+            type=int,
+            default=60,
+            help='Keep unreferenced blobs younger than this, so in-flight uploads survive (default 60)',
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help='Blobs per delete batch (default 500)')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(minutes=options['grace_minutes'])
+        orphans = (
+            MediaBlob.objects.filter(created_at__lt=cutoff)
+            .filter(~Exists(MediaRef.objects.filter(blob=OuterRef('pk'))))
+            .order_by('id')
+        )
+        variants = list(conf()['VARIANTS'])
+        blobs = files = freed = 0
+        last_id = 0
+        while True:
+            batch = list(orphans.filter(id__gt=last_id).values_list('id', 'path', 'size')[:options['batch_size']])
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            blobs += len(batch)
+            freed += sum(size for _, _, size in batch)
+            if options['dry_run']:
+                continue
+            # rows first (re-checking refs, a blob may have been re-uploaded since
+            # the scan), files second: a new upload of the same bytes then
+            # starts a fresh blob instead of pointing at a deleted file
+            doomed = MediaBlob.objects.filter(id__in=[blob_id for blob_id, _, _ in batch]).filter(
+                ~Exists(MediaRef.objects.filter(blob=OuterRef('pk')))
+            )
+            paths = list(doomed.values_list('path', flat=True))
+            doomed.delete()
+            for path in paths:
+                for name in [path] + [variant_path(path, v) for v in variants]:
+                    if default_storage.exists(name):
+                        default_storage.delete(name)
+                        files += 1
+
+        if options['dry_run']:
+            self.stdout.write(f'Would delete {blobs} unreferenced blobs ({freed / 1e6:.1f} MB)')
+            return
+        self.stdout.write(
+            self.style.SUCCESS(f'Deleted {blobs} unreferenced blobs, {files} files ({freed / 1e6:.1f} MB)')
+        )
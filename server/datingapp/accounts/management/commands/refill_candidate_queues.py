@@ -0,0 +1,75 @@
+from datetime import timedelta
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.utils import timezone
+from dating.models import Swipe
+from dating import candidates
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Precompute per-user swipe candidate queues into the configured cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--active-days',
+            type=int,
+            default=7,
+            help='Only refill users who joined or swiped within this many days (default 7)',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Refill every user, active or not',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Users per cache write (default 500)',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Keep running and refill every N seconds (background worker mode)',
+        )
+
+    def handle(self, *args, **options):
+        if not candidates.enabled():
+            raise CommandError(
+                'DATING_CANDIDATE_QUEUE uses a process-local cache, so the web workers would never see '
+                'these queues. Point it at a shared cache (e.g. set REDIS_URL), or set ALLOW_LOCAL.'
+            )
+        while True:
+            started = time.monotonic()
+            refilled = self.refill(options)
+            self.stdout.write(
+                self.style.SUCCESS(f'Refilled {refilled} candidate queues in {time.monotonic() - started:.2f}s')
+            )
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def refill(self, options):
+        users = User.objects.only(*candidates.QUEUE_USER_FIELDS).order_by('id')   # no deferred-field loads
+        if not options['all']:
+            since = timezone.now() - timedelta(days=options['active_days'])
+            recent_swipers = Swipe.objects.filter(created_at__gte=since).values('user_id')
+            users = users.filter(Q(date_joined__gte=since) | Q(id__in=recent_swipers))
+
+        refilled = 0
+        batch = {}
+        for user in users.iterator(chunk_size=options['batch_size']):
+            batch[user.id] = candidates.compute_queue(user)
+            if len(batch) >= options['batch_size']:
+                candidates.store_queues(batch)
+                refilled += len(batch)
+                batch = {}
+        if batch:
+            candidates.store_queues(batch)
+            refilled += len(batch)
+        return refilled
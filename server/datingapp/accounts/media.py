@@ -0,0 +1,167 @@
+# accounts/media.py
+"""
+Upload pipeline for profile images.
+
+- SizeLimitedUploadHandler enforces the size cap while the multipart body is
+  being streamed, so an oversized file is dropped before it is fully received.
+  The same handler hashes (sha256) every chunk on the way through.
+- save_upload() stores content once per digest (content-addressed, see
+  MediaBlob) and records the user's reference. New content is handed straight
+  to the storage backend, which copies it chunk by chunk (or moves the temp
+  file) instead of read()-ing it; repeat content is not written again.
+- schedule_variants() re-encodes resized WebP variants on a small background
+  thread pool (skipping variants the blob already has) and, once the feed-sized
+  variant exists, points the user's cover_image_url at it.
+"""
+import hashlib, io, os, threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.db import connection
+from django.db.models import F
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from datingapp import conditional
+from . import fragments
+
+PIPELINE_DEFAULTS = {
+    "MAX_UPLOAD_BYTES": 5 * 1024 * 1024,
+    "VARIANTS": {"feed": 720, "thumb": 240},   # name -> longest edge in px
+    "WEBP_QUALITY": 80,
+    "WORKERS": 2,                              # 0 = generate inline
+}
+COVER_VARIANT = "feed"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def conf():
+    return {**PIPELINE_DEFAULTS, **getattr(settings, "MEDIA_PIPELINE", {})}
+
+class SizeLimitedUploadHandler(FileUploadHandler):
+    """
+    First handler in the chain: counts and hashes bytes as chunks arrive and
+    skips a file the moment it crosses the limit. Fields that were cut off are
+    listed in `rejected` so the view can answer 400 instead of "file missing";
+    `digests` maps each accepted field to the sha256 of its content.
+    """
+    def __init__(self, request=None, max_bytes=None):
+        super().__init__(request)
+        self.max_bytes = max_bytes or conf()["MAX_UPLOAD_BYTES"]
+        self.rejected = set()
+        self.digests = {}
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.received = 0
+        self.hasher = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_bytes:
+            self.rejected.add(self.field_name)
+            raise SkipFile()
+        self.hasher.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        self.digests[self.field_name] = self.hasher.hexdigest()
+        return None  # let the default memory/temp-file handlers build the file
+
+def limit_upload_size(request):
+    """
+    Put a SizeLimitedUploadHandler in front of Django's default handlers
+    (memory, then temp file). Call before request.data / request.FILES is read.
+    """
+    limiter = SizeLimitedUploadHandler(request)
+    request.upload_handlers = [limiter, *request.upload_handlers]
+    return limiter
+
+def blob_path(digest, filename):
+    ext = os.path.splitext(filename)[1].lower()[:10]
+    return f"blobs/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+def save_upload(user_id, uploaded, digest):
+    """
+    Store `uploaded` (whose sha256 is `digest`) once and reference it from
+    `user_id`; returns the blob's storage path. Only new content is written.
+    """
+    from .models import MediaBlob, MediaRef
+    blob = MediaBlob.objects.filter(digest=digest).first()
+    if blob is None:
+        path = default_storage.save(blob_path(digest, uploaded.name), uploaded)
+        MediaBlob.objects.bulk_create(
+            [MediaBlob(digest=digest, path=path, size=uploaded.size)], ignore_conflicts=True
+        )
+        blob = MediaBlob.objects.get(digest=digest)
+        if blob.path != path:
+            default_storage.delete(path)  # lost a race with an identical upload
+    MediaRef.objects.bulk_create([MediaRef(blob=blob, user_id=user_id)], ignore_conflicts=True)
+    return blob.path
+
+def variant_path(path, variant):
+    return f"{os.path.splitext(path)[0]}_{variant}.webp"
+
+def render_variants(path):
+    """
+    Make sure every configured WebP variant of `path` exists; returns
+    {variant: path} ({} if not an image). Variants of a blob that was
+    uploaded before are reused, not re-encoded.
+    """
+    options = conf()
+    out = {v: variant_path(path, v) for v in options["VARIANTS"]}
+    missing = {v: edge for v, edge in options["VARIANTS"].items() if not default_storage.exists(out[v])}
+    if not missing:
+        return out
+    try:
+        with default_storage.open(path, "rb") as fh, Image.open(fh) as img:
+            img = ImageOps.exif_transpose(img)
+            img = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+            for variant, edge in missing.items():
+                copy = img.copy()
+                copy.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+                buf = io.BytesIO()
+                copy.save(buf, "WEBP", quality=options["WEBP_QUALITY"], method=4)
+                out[variant] = default_storage.save(variant_path(path, variant), ContentFile(buf.getvalue()))
+            return out
+    except (UnidentifiedImageError, OSError):
+        return {}
+
+def _generate(path, user_id, original_url, media_base_url):
+    from .authentication import bump_profile_version
+    from .models import User
+    variants = render_variants(path)
+    if COVER_VARIANT in variants and original_url:
+        # compare-and-set: only if the cover was not replaced in the meantime
+        if User.objects.filter(pk=user_id, cover_image_url=original_url).update(
+            cover_image_url=media_base_url + variants[COVER_VARIANT], profile_version=F("profile_version") + 1
+        ):
+            # update() sends no post_save: do what a save would have triggered
+            fragments.invalidate(user_id)
+            conditional.bump("profile", user_id)
+            bump_profile_version(User.objects.only("id", "profile_version").get(pk=user_id))
+    return variants
+
+def _generate_in_worker(*args):
+    try:
+        return _generate(*args)
+    finally:
+        connection.close()  # worker threads own their DB connection
+
+def schedule_variants(path, user_id, original_url, media_base_url):
+    """
+    Queue variant generation for an uploaded file. `original_url` is the cover
+    URL to swap for the feed variant (None to leave the profile untouched);
+    `media_base_url` is the absolute MEDIA_URL the swapped URL is built on.
+    """
+    global _executor
+    workers = conf()["WORKERS"]
+    if not workers:
+        return _generate(path, user_id, original_url, media_base_url)
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="media")
+    return _executor.submit(_generate_in_worker, path, user_id, original_url, media_base_url)
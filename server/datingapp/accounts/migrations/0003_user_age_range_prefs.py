@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='max_age_pref',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='min_age_pref',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='bio',
+            field=models.CharField(max_length=160),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='birth_date',
+            field=models.DateField(db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='cover_image_url',
+            field=models.URLField(),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='gender',
+            field=models.CharField(choices=[('male', 'Male'), ('female', 'Female'), ('other', 'Other')], max_length=16),
+        ),
+    ]
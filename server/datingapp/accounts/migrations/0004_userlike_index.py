@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_like_index(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    UserLike = apps.get_model('accounts', 'UserLike')
+    batch = []
+    for user_id, likes in User.objects.values_list('id', 'likes').iterator(chunk_size=2000):
+        batch.extend(UserLike(user_id=user_id, token=t) for t in set(likes or []))
+        if len(batch) >= 5000:
+            UserLike.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    UserLike.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_user_age_range_prefs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserLike',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='like_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('token', 'user')},
+            },
+        ),
+        migrations.RunPython(backfill_like_index, migrations.RunPython.noop),
+    ]
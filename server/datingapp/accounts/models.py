@@ -2,14 +2,47 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 from datetime import date
 
+from . import hashers
+
 GENDER_CHOICES = [("male","Male"),("female","Female"),("other","Other")]
 
+# usernames of synthetic load-test users (benchmark.generate, clear_all_data --synthetic)
+SYNTHETIC_PREFIX = "bench_"
+
+def age_on(birth_date, today):
+    """Whole years between birth_date and today (None if unknown)."""
+    if not birth_date: return None
+    years = today.year - birth_date.year
+    if (today.month, today.day) < (birth_date.month, birth_date.day):
+        years -= 1
+    return years
+
+def _years_before(today, years):
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:              # Feb 29 -> Feb 28 in a non-leap year
+        return today.replace(year=today.year - years, day=28)
+
+def birth_date_bounds(min_age, max_age, today):
+    """
+    Translate an age range into (born_after, born_on_or_before) dates so the
+    filter runs on the indexed birth_date column. Either side may be None.
+    age >= min_age  <=>  birth_date <= today - min_age years
+    age <= max_age  <=>  birth_date >  today - (max_age + 1) years
+    """
+    latest = _years_before(today, min_age) if min_age is not None else None
+    earliest = _years_before(today, max_age + 1) if max_age is not None else None
+    return earliest, latest
+
 class User(AbstractUser):
     bio = models.CharField(max_length=160, blank=False)         # short description
     gender = models.CharField(max_length=16, choices=GENDER_CHOICES, blank=False)
-    birth_date = models.DateField(null=True, blank=False)        # age is computed
+    birth_date = models.DateField(null=True, blank=False, db_index=True)  # age is computed; indexed for age-range feeds
     cover_image_url = models.URLField(blank=False)               # store URL (from upload endpoint)
     likes = models.JSONField(default=list, blank=True)          # array of tokens, e.g. ["food","songs","gym"]
+    min_age_pref = models.PositiveSmallIntegerField(null=True, blank=True)  # feed age range (inclusive)
+    max_age_pref = models.PositiveSmallIntegerField(null=True, blank=True)
+    profile_version = models.PositiveIntegerField(default=0)   # bumped by MeView, carried in access tokens
 
     # Convenience: a symmetric M2M "matches" via dating.Match
     matches = models.ManyToManyField(
@@ -25,10 +58,86 @@ class User(AbstractUser):
 
     @property
     def age(self):
-        if not self.birth_date: return None
-        today = date.today()
-        years = today.year - self.birth_date.year
-        if (today.month, today.day) < (self.birth_date.month, self.birth_date.day):
-            years -= 1
-        return years
+        return age_on(self.birth_date, date.today())
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # a user built from token claims loads every deferred field at once, from the user cache
+        if getattr(self, "_claims_only", False) and fields is not None and from_queryset is None:
+            from .authentication import user_cache
+            row = user_cache().get(self.pk, min_version=self.profile_version)
+            if row is not None:
+                for field in self.get_deferred_fields():
+                    setattr(self, field, getattr(row, field))
+                self._claims_only = False
+                return
+        super().refresh_from_db(using, fields, from_queryset)
+
+    # Hashing runs on the bounded pool in accounts.hashers; a hash made with an
+    # older hasher or cost is replaced on the first successful login.
+    def set_password(self, raw_password):
+        self.password = hashers.hash_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        is_correct, upgraded = hashers.check_password(raw_password, self.password)
+        if upgraded:
+            self.password, self._password = upgraded, None   # an upgrade is not a password change
+            self.save(update_fields=["password"])
+        return is_correct
+
+    async def acheck_password(self, raw_password):
+        is_correct, upgraded = await hashers.acheck_password(raw_password, self.password)
+        if upgraded:
+            self.password, self._password = upgraded, None
+            await self.asave(update_fields=["password"])
+        return is_correct
+
+
+class UserLike(models.Model):
+    """
+    Inverted index over User.likes: one (token, user) row per like token.
+    Kept in sync by accounts.signals on every save that touches `likes`;
+    the (token, user) unique index doubles as the token's posting list.
+    """
+    token = models.CharField(max_length=64)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="like_tokens")
+
+    class Meta:
+        unique_together = ("token","user")
+
+    def __str__(self): return f"{self.token}:{self.user_id}"
+
+    @staticmethod
+    def sync(user):
+        """Make the index rows for `user` match user.likes (diff, not rewrite)."""
+        wanted = set(user.likes or [])
+        have = set(UserLike.objects.filter(user=user).values_list("token", flat=True))
+        if have - wanted:
+            UserLike.objects.filter(user=user, token__in=have - wanted).delete()
+        if wanted - have:
+            UserLike.objects.bulk_create(
+                [UserLike(user=user, token=t) for t in wanted - have], ignore_conflicts=True
+            )
+
+class MediaBlob(models.Model):
+    """
+    One stored upload per distinct content (sha256). Files live under
+    blobs/<d[:2]>/<d[2:4]>/<digest><ext>; re-uploading the same bytes reuses them.
+    The reference count is the number of MediaRef rows; blobs left with none
+    (e.g. after their users were deleted) are removed by `manage.py gc_media_blobs`.
+    """
+    digest = models.CharField(max_length=64, unique=True)
+    path = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self): return self.digest
+
+class MediaRef(models.Model):
+    """A user's reference to a blob; deleting the user drops the reference."""
+    blob = models.ForeignKey(MediaBlob, on_delete=models.CASCADE, related_name="refs")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="media_refs")
+    created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        unique_together = ("blob","user")
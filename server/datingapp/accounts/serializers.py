@@ -1,8 +1,14 @@
 # accounts/serializers.py
 import re, json
+from datetime import date
 from django.contrib.auth import get_user_model
+from django.db import models
 from rest_framework import serializers
 
+from dating import candidates
+from . import fragments
+from .models import age_on
+
 User = get_user_model()
 TOKEN_RE = re.compile(r"^[A-Za-z0-9_]+$")   # tokens without spaces
 
@@ -40,29 +46,89 @@ def _normalize_likes(value):
             raise serializers.ValidationError(
                 "likes must be tokens without spaces (e.g. 'food','songs','gym')"
             )
+        if len(s) > 64:
+            raise serializers.ValidationError("each like must be at most 64 characters")
         out.append(s.lower())
     # dedupe preserving order
     return list(dict.fromkeys(out))
     # returns a normalized, lowercase, deduped list of like-tokens
 
+class PublicUserListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        users = data.all() if isinstance(data, models.manager.BaseManager) else data
+        return fragments.render_many(users, lambda missing: [self.child.to_representation(u) for u in missing])
+    # many=True: cached profile fragments, one multi-get per page (accounts/fragments.py)
+
 class PublicUserSerializer(serializers.ModelSerializer):
     age = serializers.SerializerMethodField()
     class Meta:
         model = User
         fields = ["id","username","first_name","last_name","bio","gender","age","birth_date","cover_image_url","likes"]
         read_only_fields = ["id","username","age"]
-    def get_age(self, obj): return obj.age
+        list_serializer_class = PublicUserListSerializer
+    def get_age(self, obj):
+        # `today` is computed once per serializer (i.e. once per page with many=True)
+        if not hasattr(self, "_today"):
+            self._today = date.today()
+        return age_on(obj.birth_date, self._today)
     # Public-facing user fields used in feed/matches
 
+# What public_profiles() needs from each .values() row
+PROFILE_COLUMNS = [f for f in PublicUserSerializer.Meta.fields if f != "age"] + ["profile_version"]
+
+def profile_dicts(rows):
+    """PublicUserSerializer output built straight from .values(*PROFILE_COLUMNS) rows."""
+    today = date.today()   # once per page: ages in bulk
+    return [
+        {
+            "id": row["id"],
+            "username": row["username"],
+            "first_name": row["first_name"],
+            "last_name": row["last_name"],
+            "bio": row["bio"],
+            "gender": row["gender"],
+            "age": age_on(row["birth_date"], today),
+            "birth_date": row["birth_date"].isoformat() if row["birth_date"] else None,
+            "cover_image_url": row["cover_image_url"],
+            "likes": row["likes"],
+        }
+        for row in rows
+    ]
+
+def public_profiles(rows):
+    """
+    PublicUserSerializer(many=True) output (same keys, order and values) for
+    .values(*PROFILE_COLUMNS) rows, via the fragment cache; misses are rendered
+    as plain dicts by profile_dicts(), without the per-field DRF machinery.
+    """
+    return fragments.render_many(rows, profile_dicts)
+
 class MeSerializer(serializers.ModelSerializer):
     age = serializers.SerializerMethodField(read_only=True)
     likes = serializers.ListField(child=serializers.CharField(), required=False)
     class Meta:
         model = User
         fields = ["id","username","email","first_name","last_name",
-                  "bio","gender","birth_date","cover_image_url","likes","age"]
+                  "bio","gender","birth_date","cover_image_url","likes","age",
+                  "min_age_pref","max_age_pref"]
         read_only_fields = ["id","username","email","age"]
+        extra_kwargs = {
+            "min_age_pref": {"min_value": 18, "max_value": 120},
+            "max_age_pref": {"min_value": 18, "max_value": 120},
+        }
     def validate_likes(self, value): return _normalize_likes(value)
+    def validate(self, attrs):
+        lo = attrs.get("min_age_pref", getattr(self.instance, "min_age_pref", None))
+        hi = attrs.get("max_age_pref", getattr(self.instance, "max_age_pref", None))
+        if lo is not None and hi is not None and lo > hi:
+            raise serializers.ValidationError({"max_age_pref": "must be >= min_age_pref"})
+        return attrs
+    def update(self, instance, validated_data):
+        old = [getattr(instance, f) for f in candidates.QUEUE_INPUTS]
+        instance = super().update(instance, validated_data)
+        if old != [getattr(instance, f) for f in candidates.QUEUE_INPUTS]:
+            candidates.invalidate(instance.pk)   # a new gender or age range means a different candidate pool
+        return instance
     def get_age(self, obj): return obj.age
     # Serializer for the authenticated user's profile (read/write)
 
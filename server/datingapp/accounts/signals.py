@@ -0,0 +1,56 @@
+# accounts/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from datingapp import conditional
+from . import authentication, fragments
+from .models import User, UserLike
+from .serializers import PublicUserSerializer
+
+# keep the likes inverted index in step with User.likes
+@receiver(post_save, sender=User)
+def sync_like_index(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields is not None and "likes" not in update_fields):
+        return
+    if created:
+        UserLike.objects.bulk_create([UserLike(user=instance, token=t) for t in set(instance.likes or [])])
+    else:
+        UserLike.sync(instance)
+
+PUBLIC_FIELDS = frozenset(PublicUserSerializer.Meta.fields)
+# saved on login and by the hasher upgrade; nothing a profile, ETag or token depends on
+CREDENTIAL_FIELDS = frozenset({"password", "last_login"})
+
+def _credentials_only(update_fields):
+    return update_fields is not None and set(update_fields) <= CREDENTIAL_FIELDS
+
+# MeView, UploadView (set_as_cover) and the admin all save through here
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_profile_fragment(sender, instance, update_fields=None, **kwargs):
+    if _credentials_only(update_fields):
+        return
+    if update_fields is None or PUBLIC_FIELDS & set(update_fields):
+        fragments.invalidate(instance.pk)
+
+# MeView's ETag (datingapp/conditional.py)
+@receiver(post_save, sender=User)
+def bump_profile_counter(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if not (created or raw or _credentials_only(update_fields)):
+        conditional.bump("profile", instance.pk)
+
+@receiver(post_delete, sender=User)
+def revoke_deleted_user(sender, instance, **kwargs):
+    authentication.revoke(instance.pk)
+
+# token claims are trusted without a query (accounts/authentication.py); this is what stops them
+@receiver(post_save, sender=User)
+def revoke_inactive_user(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw or created or _credentials_only(update_fields) or (
+        update_fields is not None and "is_active" not in update_fields
+    ):
+        return
+    if instance.is_active:
+        authentication.unrevoke(instance.pk)
+    else:
+        authentication.revoke(instance.pk)
@@ -1,3 +1,298 @@
-from django.test import TestCase
+from contextlib import redirect_stdout
+from datetime import date, timedelta
+import io, json, logging, tempfile, threading
+from operator import attrgetter
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from dating import candidates
+from dating.models import Match, Swipe
+from datingapp import conditional
+from datingapp.logutils import JsonFormatter, SampleFilter
+
+from . import authentication, hashers, media
+from .models import MediaBlob, MediaRef, User, UserLike, age_on, birth_date_bounds
+
+class BirthDateBoundsTests(SimpleTestCase):
+    def test_bounds_agree_with_age_on(self):
+        for today in (date(2024, 2, 29), date(2025, 2, 28), date(2025, 3, 1), date(2025, 12, 31)):
+            earliest, latest = birth_date_bounds(25, 30, today)
+            born = date(today.year - 35, 1, 1)
+            while born <= date(today.year - 20, 12, 31):
+                in_range = 25 <= age_on(born, today) <= 30
+                in_bounds = earliest < born <= latest
+                self.assertEqual(in_range, in_bounds, (today, born))
+                born += timedelta(days=1)
+
+    def test_open_ended_range(self):
+        self.assertEqual(birth_date_bounds(None, None, date(2025, 1, 1)), (None, None))
+        self.assertEqual(birth_date_bounds(18, None, date(2025, 1, 1)), (None, date(2007, 1, 1)))
+
+class LikeIndexSyncTests(TestCase):
+    def tokens(self, user):
+        return set(UserLike.objects.filter(user=user).values_list("token", flat=True))
+
+    def test_index_follows_likes(self):
+        user = User.objects.create(username="u", gender="male", likes=["food", "gym"])
+        self.assertEqual(self.tokens(user), {"food", "gym"})
+        user.likes = ["gym", "songs"]
+        user.save()
+        self.assertEqual(self.tokens(user), {"gym", "songs"})
+        user.bio = "changed"
+        with self.assertNumQueries(1):
+            user.save(update_fields=["bio"])
+
+def png_upload(name="cover.png", size=(1600, 1200)):
+    buf = io.BytesIO()
+    Image.new("RGB", size, (200, 30, 90)).save(buf, "PNG")
+    return SimpleUploadedFile(name, buf.getvalue(), content_type="image/png")
+
+@override_settings(
+    MEDIA_ROOT=tempfile.mkdtemp(),
+    MEDIA_PIPELINE={"MAX_UPLOAD_BYTES": 200_000, "VARIANTS": {"feed": 720, "thumb": 240}, "WORKERS": 0},
+)
+class UploadPipelineTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="u", gender="male", cover_image_url="https://example.com/old.jpg")
+        self.client.force_authenticate(self.user)
+
+    def test_cover_upload_points_at_feed_variant(self):
+        res = self.client.post(reverse("upload") + "?set_as_cover=true", {"file": png_upload()}, format="multipart")
+        self.assertEqual(res.status_code, 201)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.cover_image_url, res.data["variants"]["feed"])
+        self.assertTrue(self.user.cover_image_url.endswith("_feed.webp"))
+        # the worker's update() moved profile_version; the auth cache follows it
+        self.assertEqual(cache.get(authentication._version_key(self.user.pk)), self.user.profile_version)
+
+    def test_oversized_upload_rejected_while_streaming(self):
+        noise = SimpleUploadedFile("big.bin", b"x" * 300_000, content_type="application/octet-stream")
+        res = self.client.post(reverse("upload"), {"file": noise}, format="multipart")
+        self.assertEqual(res.status_code, 400)
+        self.assertIn("too large", res.data["detail"])
+
+    def test_identical_uploads_share_one_blob(self):
+        other = User.objects.create(username="v", gender="female")
+        first = self.client.post(reverse("upload"), {"file": png_upload("a.png")}, format="multipart")
+        self.client.force_authenticate(other)
+        second = self.client.post(reverse("upload"), {"file": png_upload("b.png")}, format="multipart")
+        self.assertEqual(first.data["url"], second.data["url"])
+        self.assertEqual(MediaBlob.objects.count(), 1)
+        self.assertEqual(MediaRef.objects.count(), 2)
+
+    def test_gc_removes_unreferenced_blobs(self):
+        self.client.post(reverse("upload"), {"file": png_upload()}, format="multipart")
+        blob = MediaBlob.objects.get()
+        self.user.delete()
+        call_command("gc_media_blobs", grace_minutes=0, stdout=io.StringIO())
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(default_storage.exists(blob.path))
+        self.assertFalse(default_storage.exists(media.variant_path(blob.path, "feed")))
+
+class RegisterLoggingTests(APITestCase):
+    payload = {"username": "new", "password": "s3cret-pass!", "bio": "hi", "gender": "male", "birth_date": "1999-01-01"}
+
+    def test_signup_does_not_print(self):
+        with redirect_stdout(io.StringIO()) as out:
+            res = self.client.post(reverse("register"), self.payload, format="json")
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(out.getvalue(), "")
+
+    def test_debug_payload_is_redacted(self):
+        with self.assertLogs("accounts.views", level="DEBUG") as logs:
+            self.client.post(reverse("register"), {**self.payload, "bio": ""}, format="json")
+        line = JsonFormatter().format(logs.records[0])
+        self.assertNotIn("s3cret-pass!", line)
+        self.assertEqual(json.loads(line)["data"]["password"], "***")
+
+class SampleFilterTests(SimpleTestCase):
+    def record(self, level, endpoint):
+        record = logging.LogRecord("datingapp.request", level, "", 0, "GET /", (), None)
+        record.endpoint = endpoint
+        return record
+
+    def test_per_endpoint_rates(self):
+        sampler = SampleFilter(default=1.0, rates={"swipe": 0})
+        self.assertTrue(sampler.filter(self.record(logging.INFO, "feed")))
+        self.assertFalse(sampler.filter(self.record(logging.INFO, "swipe")))
+        self.assertTrue(sampler.filter(self.record(logging.WARNING, "swipe")))
+
+class SampleDataCommandTests(TestCase):
+    def test_bulk_sample_data(self):
+        with self.assertNumQueries(5):   # existing check, savepoint, users, likes, release
+            call_command("create_sample_data", stdout=io.StringIO())
+        user = User.objects.get(username="alex_smith")
+        self.assertTrue(user.check_password("password123"))
+        self.assertEqual(set(UserLike.objects.filter(user=user).values_list("token", flat=True)), set(user.likes))
+
+        call_command("create_sample_interactions", stdout=io.StringIO())
+        emma = User.objects.get(username="emma_johnson")
+        self.assertTrue(Match.objects.filter(user1=min(user, emma, key=attrgetter("id")),
+                                             user2=max(user, emma, key=attrgetter("id"))).exists())
+
+class ClearAllDataTests(TestCase):
+    def setUp(self):
+        self.real = User.objects.create(username="real", gender="male", likes=["gym"])
+        self.fake = User.objects.create(username="bench_1", gender="female", likes=["gym"])
+        Swipe.objects.create(user=self.real, target=self.fake, is_like=True)
+        Swipe.objects.create(user=self.fake, target=self.real, is_like=True)
+        Match.objects.create(user1=self.real, user2=self.fake)
+
+    def test_synthetic_purge_keeps_real_users(self):
+        call_command("clear_all_data", confirm=True, synthetic=True, batch_size=1, stdout=io.StringIO())
+        self.assertEqual(list(User.objects.values_list("username", flat=True)), ["real"])
+        self.assertFalse(Swipe.objects.exists() or Match.objects.exists())
+        self.assertEqual(UserLike.objects.count(), 1)
+
+    def test_full_purge(self):
+        call_command("clear_all_data", confirm=True, stdout=io.StringIO())
+        self.assertFalse(User.objects.exists() or Swipe.objects.exists() or UserLike.objects.exists())
+
+    @override_settings(CLAIMS_AUTH={"ALLOW_LOCAL": True}, DATING_CANDIDATE_QUEUE={"ALLOW_LOCAL": True})
+    def test_purged_users_lose_tokens_fragments_and_queues(self):
+        cache.clear()
+        token = authentication.tokens_for(self.fake).access_token
+        candidates.store_queues({self.fake.pk: [self.real.pk], self.real.pk: [self.fake.pk]})
+        call_command("clear_all_data", confirm=True, synthetic=True, stdout=io.StringIO())
+        self.assertIsNone(cache.get(candidates._key(self.fake.pk)))
+        self.assertIsNotNone(cache.get(candidates._key(self.real.pk)))   # drops the dead id when served
+        with self.assertRaises(AuthenticationFailed):
+            authentication.ClaimsJWTAuthentication().get_user(token)
+        token = authentication.tokens_for(self.real).access_token
+        call_command("clear_all_data", confirm=True, stdout=io.StringIO())
+        with self.assertRaises(AuthenticationFailed):
+            authentication.ClaimsJWTAuthentication().get_user(token)
+
+class PasswordHashingTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="old", bio="hi", gender="male", birth_date=date(1995, 1, 1))
+        # what a pre-upgrade account looks like (cheap iteration count to keep the test fast)
+        self.user.password = PBKDF2PasswordHasher().encode("correct horse 1", "somesalt", iterations=1000)
+        self.user.save(update_fields=["password"])
+
+    def login(self, password):
+        return self.client.post(reverse("token_obtain_pair"), {"username": "old", "password": password}, format="json")
+
+    def test_login_upgrades_old_hash(self):
+        self.assertEqual(self.login("wrong password").status_code, 401)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$1000$"))
+
+        res = self.login("correct horse 1")
+        self.assertEqual(res.status_code, 200)
+        self.assertIn("access", res.data)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith(f"scrypt${hashers.conf()['SCRYPT_WORK_FACTOR']}$"))
+        self.assertEqual(self.login("correct horse 1").status_code, 200)
+
+    @override_settings(CONDITIONAL_GET={"ALLOW_LOCAL": True})
+    def test_rehash_and_login_time_keep_the_profile_etag(self):
+        before = conditional.versions(self.user.pk, ["profile"])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.login("correct horse 1").status_code, 200)   # rehashes the password
+            self.user.last_login = self.user.date_joined
+            self.user.save(update_fields=["last_login"])
+        self.assertEqual(conditional.versions(self.user.pk, ["profile"]), before)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save(update_fields=["bio", "password"])
+        self.assertNotEqual(conditional.versions(self.user.pk, ["profile"]), before)
+
+    def test_async_check_upgrades_too(self):
+        self.assertFalse(async_to_sync(self.user.acheck_password)("wrong password"))
+        self.assertTrue(async_to_sync(self.user.acheck_password)("correct horse 1"))
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("scrypt$"))
+
+    @override_settings(PASSWORD_HASHING={"WAIT_SECONDS": 0})
+    def test_full_pool_answers_503(self):
+        hashers._pool()
+        with mock.patch.object(hashers, "_slots", threading.Semaphore(0)):
+            res = self.login("correct horse 1")
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.data["detail"].code, "hashing_busy")
+
+@override_settings(CLAIMS_AUTH={"ALLOW_LOCAL": True})   # tests run on LocMemCache
+class ClaimsAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        authentication.user_cache().rows.clear()
+        self.me = User.objects.create(
+            username="me", gender="male", birth_date=date(1995, 1, 1), min_age_pref=20, max_age_pref=40, likes=["gym"],
+        )
+        self.token = authentication.tokens_for(self.me)
+
+    def auth(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_claims_user_needs_no_query(self):
+        user = authentication.ClaimsJWTAuthentication().get_user(self.token.access_token)
+        with self.assertNumQueries(0):
+            self.assertEqual((user.pk, user.gender, user.birth_date, user.max_age_pref), (self.me.pk, "male", date(1995, 1, 1), 40))
+        # the rest comes from the user cache, all at once and then without a query
+        with self.assertNumQueries(1):
+            self.assertEqual((user.likes, user.username), (["gym"], "me"))
+        with self.assertNumQueries(0):
+            authentication.ClaimsJWTAuthentication().get_user(self.token.access_token).likes
+
+    def test_profile_update_retires_old_claims(self):
+        self.auth(self.token.access_token)
+        res = self.client.patch(reverse("me"), {"max_age_pref": 30}, format="json")
+        self.assertEqual(res.status_code, 200)
+        self.me.refresh_from_db()
+        self.assertEqual(self.me.profile_version, 1)
+
+        # the old access token still works, but its claims are no longer trusted
+        old = authentication.ClaimsJWTAuthentication().get_user(self.token.access_token)
+        self.assertEqual(old.max_age_pref, 30)
+        self.assertFalse(getattr(old, "_claims_only", False))
+
+        res = self.client.post(reverse("token_refresh"), {"refresh": str(self.token)}, format="json")
+        self.assertEqual(res.status_code, 200)
+        fresh = authentication.ClaimsJWTAuthentication().get_user(AccessToken(res.data["access"]))
+        self.assertTrue(fresh._claims_only)
+        self.assertEqual((fresh.max_age_pref, fresh.profile_version), (30, 1))
+
+    def test_deleted_or_inactive_user_gets_401(self):
+        self.auth(self.token.access_token)
+        self.me.is_active = False
+        self.me.save()
+        self.assertEqual(self.client.get(reverse("feed")).status_code, 401)
+        self.me.is_active = True
+        self.me.save()
+        self.assertEqual(self.client.get(reverse("feed")).status_code, 200)
+
+        other = User.objects.create(username="other", gender="female", birth_date=date(1996, 1, 1))
+        self.me.delete()
+        self.assertEqual(self.client.get(reverse("feed")).status_code, 401)
+        self.assertEqual(self.client.get(reverse("me")).status_code, 401)
+        res = self.client.post(reverse("swipe"), {"target_id": other.id, "action": "like"}, format="json")
+        self.assertEqual(res.status_code, 401)
+
+    @override_settings(CLAIMS_AUTH={})
+    def test_process_local_cache_checks_the_db(self):
+        # a purge in another process: this one never sees its revocations
+        other = User.objects.create(username="other", gender="female", birth_date=date(1996, 1, 1))
+        self.auth(self.token.access_token)
+        self.assertFalse(authentication.claims_trusted())
+        self.assertFalse(getattr(authentication.ClaimsJWTAuthentication().get_user(self.token.access_token), "_claims_only", False))
+        User.objects.filter(pk=self.me.pk).update(is_active=False)
+        self.assertEqual(self.client.get(reverse("feed")).status_code, 401)
+        for qs in (UserLike.objects.filter(user=self.me), User.objects.filter(pk=self.me.pk)):
+            qs._raw_delete("default")   # as clear_all_data does: no signals
+        cache.clear()
+        for name in ("feed", "matches"):
+            self.assertEqual(self.client.get(reverse(name)).status_code, 401)
+        res = self.client.post(reverse("swipe-batch"), {"swipes": [{"target_id": other.id, "action": "like"}]}, format="json")
+        self.assertEqual(res.status_code, 401)
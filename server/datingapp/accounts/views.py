@@ -1,23 +1,27 @@
 # accounts/views.py
-import os, uuid, json
+import logging
+
 from django.conf import settings
-from django.core.files.base import ContentFile
-from django.core.files.storage import default_storage
 from django.contrib.auth import get_user_model
 
 from rest_framework import generics, permissions, status
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
-from rest_framework_simplejwt.tokens import RefreshToken
 
 from .serializers import (
     RegisterFullSerializer,
     MeSerializer,
     _normalize_likes,
 )
+from . import media
+from .authentication import bump_profile_version, tokens_for
+from datingapp.conditional import conditional
+from datingapp.logutils import redact
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
 
 class RegisterView(APIView):
     """
@@ -29,10 +33,11 @@ class RegisterView(APIView):
     parser_classes = [JSONParser, MultiPartParser, FormParser]
 
     def post(self, request):
-        print("=== Registration Debug ===")
-        print("Raw data:", dict(request.data))
-        print("Files:", dict(request.FILES))
-        
+        limiter = media.limit_upload_size(request)  # before request.data is parsed
+        debug = logger.isEnabledFor(logging.DEBUG)   # ACCOUNTS_LOG_LEVEL=DEBUG
+        if debug:
+            logger.debug("register payload", extra={"data": redact(request.data), "files": redact(dict(request.FILES))})
+
         data = request.data.copy()
 
         # Handle multipart form data - extract single values from lists
@@ -46,39 +51,36 @@ class RegisterView(APIView):
 
         # Normalize likes if it came as a string (multipart)
         if "likes" in processed_data and not isinstance(processed_data.get("likes"), list):
-            print("Processing likes:", processed_data.get("likes"))
             try:
                 processed_data["likes"] = _normalize_likes(processed_data.get("likes"))
-                print("Normalized likes:", processed_data["likes"])
             except Exception as e:
-                print("Likes normalization error:", str(e))
+                if debug:
+                    logger.debug("register likes rejected", extra={"likes": processed_data.get("likes"), "error": str(e)})
                 return Response({"likes": [str(e)]}, status=400)
 
         cover_file = request.FILES.get("cover")
+        if "cover" in limiter.rejected:
+            return Response({"detail": "cover too large (max 5MB)"}, status=400)
 
-        print("Final data before serializer:", processed_data)
         ser = RegisterFullSerializer(data=processed_data)
         if not ser.is_valid():
-            print("Serializer errors:", ser.errors)
+            if debug:
+                logger.debug("register invalid", extra={"data": redact(processed_data), "errors": ser.errors})
             return Response(ser.errors, status=400)
         
         user = ser.save()
 
-        # Save cover if provided
+        # Save cover if provided (streamed to storage; WebP variants built in the background)
         if cover_file:
-            if cover_file.size > 5 * 1024 * 1024:
-                user.delete()
-                return Response({"detail": "cover too large (max 5MB)"}, status=400)
-            folder = f"uploads/{user.id}/"
-            name = f"{uuid.uuid4().hex}_{cover_file.name}"
-            path = default_storage.save(os.path.join(folder, name), ContentFile(cover_file.read()))
-            rel_url = settings.MEDIA_URL + path
-            abs_url = request.build_absolute_uri(rel_url)
+            path = media.save_upload(user.id, cover_file, limiter.digests["cover"])
+            media_base = request.build_absolute_uri(settings.MEDIA_URL)
+            abs_url = media_base + path
             user.cover_image_url = abs_url
             user.save(update_fields=["cover_image_url"])
+            media.schedule_variants(path, user.id, abs_url, media_base)
 
         # Issue tokens on signup
-        refresh = RefreshToken.for_user(user)
+        refresh = tokens_for(user)
         return Response(
             {"user": MeSerializer(user).data, "access": str(refresh.access_token), "refresh": str(refresh)},
             status=status.HTTP_201_CREATED,
@@ -92,35 +94,52 @@ class MeView(generics.RetrieveUpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = MeSerializer
 
+    @conditional("me", "profile")
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     def get_object(self):
-        return self.request.user
+        # request.user may be built from token claims (accounts.authentication); read the row itself
+        user = User.objects.filter(pk=self.request.user.pk, is_active=True).first()
+        if user is None:
+            raise AuthenticationFailed("User not found or inactive", code="user_inactive")
+        return user
+
+    def perform_update(self, serializer):
+        user = serializer.save(profile_version=serializer.instance.profile_version + 1)
+        bump_profile_version(user)
     # Retrieve or update the current authenticated user's profile
 
 class UploadView(APIView):
     """
     Standalone upload endpoint (multipart). Field name: 'file'
     Optional: ?set_as_cover=true to also set cover_image_url.
-    Returns { "url": "<absolute url>" }.
+    Returns { "url": "<absolute url>", "variants": { name: "<absolute url>" } }.
+    Variants are resized WebP copies rendered in the background; their URLs are
+    reserved up front and may take a moment to appear. A cover switches to the
+    "feed" variant once it is ready.
     """
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
 
     def post(self, request):
+        limiter = media.limit_upload_size(request)  # before request.FILES is parsed
         f = request.FILES.get("file")
+        if "file" in limiter.rejected:
+            return Response({"detail": "file too large (max 5MB)"}, status=400)
         if not f:
             return Response({"detail": "file missing"}, status=400)
-        if f.size > 5 * 1024 * 1024:
-            return Response({"detail": "file too large (max 5MB)"}, status=400)
 
-        folder = f"uploads/{request.user.id}/"
-        name = f"{uuid.uuid4().hex}_{f.name}"
-        path = default_storage.save(os.path.join(folder, name), ContentFile(f.read()))
-        rel_url = settings.MEDIA_URL + path
-        abs_url = request.build_absolute_uri(rel_url)
+        path = media.save_upload(request.user.id, f, limiter.digests["file"])
+        media_base = request.build_absolute_uri(settings.MEDIA_URL)
+        abs_url = media_base + path
 
-        if request.query_params.get("set_as_cover") == "true":
+        set_as_cover = request.query_params.get("set_as_cover") == "true"
+        if set_as_cover:
             request.user.cover_image_url = abs_url
             request.user.save(update_fields=["cover_image_url"])
+        media.schedule_variants(path, request.user.id, abs_url if set_as_cover else None, media_base)
 
-        return Response({"url": abs_url}, status=status.HTTP_201_CREATED)
+        variants = {v: media_base + media.variant_path(path, v) for v in media.conf()["VARIANTS"]}
+        return Response({"url": abs_url, "variants": variants}, status=status.HTTP_201_CREATED)
     # Simple authenticated multipart file upload endpoint (optionally set as cover)
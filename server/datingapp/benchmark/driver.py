@@ -0,0 +1,143 @@
+# benchmark/driver.py
+"""
+Mixed-traffic load driver.
+
+Virtual users (threads) repeatedly pick an operation from a weighted mix of
+feed / swipe / matches and issue it as a random synthetic user, either
+in-process through Django's test client or over HTTP against a running server.
+Swipes target profiles the same user was just shown in their feed, like a real
+client would (a random other user when there is none). Every request is timed; see report.summarize() for the numbers.
+"""
+import itertools, json, random, threading, time
+import urllib.error, urllib.request
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import Client
+
+from accounts.authentication import tokens_for
+
+User = get_user_model()
+
+DEFAULT_MIX = {"feed": 0.5, "swipe": 0.4, "matches": 0.1}
+PATHS = {
+    "feed": "/api/dating/feed/",
+    "swipe": "/api/dating/swipe/",
+    "matches": "/api/dating/matches/",
+}
+
+def access_token(user_id):
+    """A signed access token (with profile claims) for `user_id` without a password round trip."""
+    return str(tokens_for(User.objects.get(pk=user_id)).access_token)
+
+class ClientTransport:
+    """In-process requests through django.test.Client (one client per thread)."""
+    label = "client"
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def request(self, method, path, token, body=None):
+        client = getattr(self.local, "client", None)
+        if client is None:
+            client = self.local.client = Client()
+        response = client.generic(
+            method, path, json.dumps(body) if body is not None else "",
+            content_type="application/json", HTTP_AUTHORIZATION=f"Bearer {token}",
+        )
+        return response.status_code, response.content
+
+    def close_thread(self):
+        connections.close_all()
+
+class HttpTransport:
+    """Real HTTP against a running server, e.g. http://127.0.0.1:8000."""
+    label = "http"
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def request(self, method, path, token, body=None):
+        req = urllib.request.Request(
+            self.base_url + path, method=method,
+            data=json.dumps(body).encode() if body is not None else None,
+            headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+        except OSError:   # refused / reset / timed out: an error sample, not a dead worker
+            return 0, b""
+
+    def close_thread(self):
+        pass
+
+def parse_mix(text):
+    """'feed=0.5,swipe=0.4,matches=0.1' -> dict (weights need not sum to 1)."""
+    mix = {}
+    for part in filter(None, text.split(",")):
+        name, _, weight = part.partition("=")
+        if name not in PATHS:
+            raise ValueError(f"unknown endpoint {name!r} (choose from {', '.join(PATHS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+def _other(rng, user_ids, me):
+    """A random user id other than `me` (a self-swipe is a 400, not a benchmark sample)."""
+    while True:
+        target = rng.choice(user_ids)
+        if target != me:
+            return target
+
+def run(transport, user_ids, requests=1000, concurrency=4, mix=None, seed=0, duration=None):
+    """
+    Issue `requests` requests (or run for `duration` seconds) over `concurrency`
+    threads as users drawn from `user_ids`. Returns (samples, wall_seconds) where
+    samples are (endpoint, milliseconds, status) tuples.
+    """
+    if len(set(user_ids)) < 2:
+        raise ValueError("need at least two users, so swipes have someone else to target")
+    mix = mix or DEFAULT_MIX
+    names, weights = list(mix), list(mix.values())
+    tokens = {}
+    counter = itertools.count()
+    deadline = time.monotonic() + duration if duration else None
+    results = [[] for _ in range(concurrency)]
+
+    def worker(slot):
+        rng = random.Random(seed * 1000 + slot)
+        shown = {}   # user -> ids from their last feed page
+        out = results[slot]
+        try:
+            while True:
+                if deadline is not None:
+                    if time.monotonic() >= deadline:
+                        break
+                elif next(counter) >= requests:
+                    break
+                me = rng.choice(user_ids)
+                token = tokens.get(me) or tokens.setdefault(me, access_token(me))
+                op = rng.choices(names, weights)[0]
+                body = None
+                if op == "swipe":
+                    queue = shown.get(me) or [_other(rng, user_ids, me)]
+                    body = {"target_id": queue.pop(0), "action": rng.choice(("like", "pass")), "next": False}
+                started = time.perf_counter()
+                status, content = transport.request("POST" if body else "GET", PATHS[op], token, body)
+                out.append((op, (time.perf_counter() - started) * 1000, status))
+                if op == "feed" and status == 200:
+                    shown[me] = [row["id"] for row in json.loads(content)]
+        finally:
+            transport.close_thread()
+
+    threads = [threading.Thread(target=worker, args=(slot,)) for slot in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+    return [sample for chunk in results for sample in chunk], wall
@@ -0,0 +1,259 @@
+# benchmark/generate.py
+"""
+Synthetic population for load tests: users, swipes and the matches they imply.
+
+Shapes follow what a real swipe app looks like rather than uniform noise:
+- swipe out-degree is Pareto distributed (a few users swipe thousands of
+  profiles, most swipe a handful)
+- targets are drawn by a heavy-tailed (log-normal) "attractiveness" weight, so
+  in-degree and like rate are skewed towards popular profiles as well
+- a share of likes is returned (`reciprocity`), which is where matches come from
+- swipes go to the opposite gender ("other" swipes on everyone)
+- likes come from a Zipf-weighted vocabulary; last_login ages are exponential
+
+Everything is seeded per chunk (same seed + sizes = same data, whatever the
+number of workers). Rows are drawn in a process pool while the main process
+inserts the previous chunk with bulk_create, so memory stays bounded by a few
+chunks plus a few arrays per user; a million users and ten million swipes take
+minutes. All users share one precomputed password hash (hashing is by far the
+slowest part of create_user). Users are named "<PREFIX><n>" so they can be told
+apart from real accounts. Bulk inserts skip signals, so UserLike rows are
+written here.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models.functions import Length
+from django.utils import timezone
+
+from accounts.models import SYNTHETIC_PREFIX, UserLike
+from dating.models import Match, Swipe
+
+User = get_user_model()
+
+PREFIX = SYNTHETIC_PREFIX
+LIKE_TOKENS = [
+    "music", "travel", "food", "movies", "gym", "reading", "coffee", "hiking", "photography", "gaming",
+    "art", "dancing", "yoga", "cooking", "fashion", "football", "cricket", "tech", "anime", "pets",
+    "nature", "running", "writing", "wine", "beach", "cycling", "painting", "theatre", "poetry", "chess",
+    "swimming", "basketball", "meditation", "volunteering", "startups", "baking", "camping", "concerts",
+    "podcasts", "karaoke",
+]
+GENDERS = ("male", "female", "other")
+
+_state = {}   # per-process inputs for the swipe workers (set once by the pool initializer)
+
+def _zipf_weights(n, s=1.1):
+    w = 1.0 / np.arange(1, n + 1) ** s
+    return w / w.sum()
+
+def _rng(seed, kind, chunk_index):
+    return np.random.default_rng([seed, kind, chunk_index])
+
+def _pool(workers, initializer=None, initargs=()):
+    """Process pool, or None for workers=0 (run inline, like MEDIA_PIPELINE)."""
+    if not workers:
+        if initializer:
+            initializer(*initargs)
+        return None
+    return ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs)
+
+def _run(pool, fn, jobs):
+    """map() over a pool (results in order, computed ahead) or inline."""
+    return pool.map(fn, *zip(*jobs)) if pool else (fn(*job) for job in jobs)
+
+def _user_rows(seed, chunk_index, size):
+    """(gender index, age in days, idle minutes, likes) columns for one chunk of users."""
+    rng = _rng(seed, 1, chunk_index)
+    genders = rng.choice(3, size=size, p=[0.48, 0.48, 0.04])
+    ages_days = ((18 + np.minimum(rng.gamma(2.0, 4.0, size), 42)) * 365.25).astype(int)
+    idle_minutes = rng.exponential(20 * 24 * 60, size).astype(int)
+    token_p = _zipf_weights(len(LIKE_TOKENS))
+    likes = [
+        [LIKE_TOKENS[t] for t in rng.choice(len(LIKE_TOKENS), size=k, replace=False, p=token_p)]
+        for k in rng.integers(0, 6, size)
+    ]
+    return genders.tolist(), ages_days.tolist(), idle_minutes.tolist(), likes
+
+def next_suffix():
+    """One past the largest n among existing "<PREFIX><n>" users (a count would reuse names after deletions)."""
+    last = (
+        User.objects.filter(username__regex=rf"^{PREFIX}[0-9]+$")
+        .order_by(Length("username").desc(), "-username")   # unpadded numbers: longer is larger
+        .values_list("username", flat=True)
+        .first()
+    )
+    return int(last[len(PREFIX):]) + 1 if last else 0
+
+def create_users(n, seed=42, chunk=50_000, password="benchmark", workers=0, log=print):
+    """Insert `n` synthetic users (+ their UserLike rows); returns how many were created."""
+    offset = next_suffix()
+    password_hash = make_password(password) if password else make_password(None)
+    today = date.today()
+    now = timezone.now()
+    jobs = [(seed, i, min(chunk, n - start)) for i, start in enumerate(range(0, n, chunk))]
+    created = 0
+    pool = _pool(workers)
+    try:
+        for genders, ages_days, idle_minutes, likes in _run(pool, _user_rows, jobs):
+            users = [
+                User(
+                    username=f"{PREFIX}{offset + created + i}", password=password_hash, bio="benchmark user",
+                    gender=GENDERS[genders[i]], birth_date=today - timedelta(days=ages_days[i]),
+                    likes=likes[i], last_login=now - timedelta(minutes=idle_minutes[i]),
+                    cover_image_url="https://example.com/bench.jpg",
+                )
+                for i in range(len(genders))
+            ]
+            with transaction.atomic():
+                User.objects.bulk_create(users, batch_size=5000)   # pks come back (RETURNING)
+                UserLike.objects.bulk_create(
+                    [UserLike(user_id=u.pk, token=t) for u in users for t in u.likes], batch_size=10000,
+                )
+            created += len(users)
+            log(f"  users: {created}/{n}")
+    finally:
+        if pool:
+            pool.shutdown()
+    return created
+
+def load_population():
+    """(ids, genders) of every synthetic user, ordered by id, as NumPy arrays."""
+    rows = User.objects.filter(username__startswith=PREFIX).order_by("id").values_list("id", "gender")
+    ids, genders = [], []
+    for uid, gender in rows.iterator(chunk_size=10000):
+        ids.append(uid)
+        genders.append({"male": 0, "female": 1}.get(gender, 2))
+    return np.array(ids, dtype=np.int64), np.array(genders, dtype=np.int8)
+
+def _init_swipe_state(state):
+    _state.clear()
+    _state.update(state)
+    # per gender: candidate pool and cumulative attractiveness for inverse-CDF draws
+    _state["draw"] = {g: (m, np.cumsum(state["attractiveness"][m])) for g, m in state["pools"].items()}
+
+def _swipe_rows(chunk_index, start, end):
+    """
+    Swipes of users start..end-1 as index arrays (swiper, target, is_like),
+    reciprocal likes appended. Duplicate draws are topped up so every user gets
+    their full degree.
+    """
+    st = _state
+    n, genders, want = st["n"], st["genders"], st["degree"][start:end]
+    rng = _rng(st["seed"], 2, chunk_index)
+    keys, need = np.empty(0, dtype=np.int64), want.copy()
+    for _ in range(4):
+        if not need.any():
+            break
+        swipers = np.repeat(np.arange(start, end), need)
+        targets = np.empty_like(swipers)
+        u = rng.random(len(swipers))
+        for g, (members, cum) in st["draw"].items():
+            mask = genders[swipers] == g
+            targets[mask] = members[np.searchsorted(cum, u[mask] * cum[-1], side="right").clip(max=len(members) - 1)]
+        drawn = swipers * n + targets
+        keys = np.union1d(keys, drawn[swipers != targets])   # in-memory dedup: one swipe per pair
+        need = np.clip(want - np.bincount(keys // n - start, minlength=end - start), 0, None)
+    swipers, targets = keys // n, keys % n
+    likes = rng.random(len(keys)) < np.clip(st["like_rate"] * (0.4 + 1.2 * st["percentile"][targets]), 0, 1)
+    back = likes & (rng.random(len(keys)) < st["reciprocity"])
+    return (
+        np.concatenate([swipers, targets[back]]),
+        np.concatenate([targets, swipers[back]]),
+        np.concatenate([likes, np.ones(int(back.sum()), dtype=bool)]),
+    )
+
+def insert_swipes(rows):
+    """
+    (user_id, target_id, is_like) rows in one executemany, skipping pairs that
+    already exist. Bypasses bulk_create's per-value compilation, which costs
+    more than the insert itself at this volume.
+    """
+    created_at = connection.ops.adapt_datetimefield_value(timezone.now())
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(
+            f"""
+            INSERT INTO {Swipe._meta.db_table} (user_id, target_id, is_like, created_at)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (user_id, target_id) DO NOTHING
+            """,
+            [(a, b, like, created_at) for a, b, like in rows],
+        )
+
+def create_swipes(ids, genders, total, seed=42, chunk=200_000, like_rate=0.5, reciprocity=0.1,
+                  workers=0, log=print):
+    """Insert about `total` swipes among `ids`; returns the number generated (before conflicts)."""
+    n = len(ids)
+    if n < 2 or total <= 0:
+        return 0
+    rng = _rng(seed, 0, 0)
+    attractiveness = rng.lognormal(0.0, 1.0, n)
+    percentile = attractiveness.argsort().argsort() / max(n - 1, 1)
+    pools = {0: np.flatnonzero(genders == 1), 1: np.flatnonzero(genders == 0), 2: np.arange(n)}
+    pools = {g: m if len(m) else np.arange(n) for g, m in pools.items()}
+
+    # nobody swipes through more than a fifth of their pool; what the cap cuts
+    # off the heaviest swipers is spread over the rest so the total still holds
+    cap = np.array([len(pools[g]) for g in genders]) - 1
+    limit = np.maximum(cap // 5, 1)
+    degree = rng.pareto(1.1, n) + 1.0
+    degree *= total / degree.sum()
+    for _ in range(5):
+        over = degree > limit
+        excess = (degree[over] - limit[over]).sum()
+        degree = np.minimum(degree, limit)
+        if not excess or over.all():
+            break
+        degree[~over] *= 1 + excess / degree[~over].sum()
+    degree = np.round(degree).astype(np.int64)
+
+    cum = np.cumsum(degree)
+    jobs, start = [], 0
+    while start < n:
+        base = cum[start - 1] if start else 0
+        end = min(max(int(np.searchsorted(cum, base + chunk, side="right")), start + 1), n)
+        jobs.append((len(jobs), start, end))
+        start = end
+
+    state = dict(n=n, seed=seed, genders=genders, degree=degree, pools=pools, attractiveness=attractiveness,
+                 percentile=percentile, like_rate=like_rate, reciprocity=reciprocity)
+    written = 0
+    pool = _pool(workers, _init_swipe_state, (state,))
+    try:
+        for swipers, targets, likes in _run(pool, _swipe_rows, jobs):
+            insert_swipes(zip(ids[swipers].tolist(), ids[targets].tolist(), likes.tolist()))
+            written += len(swipers)
+            log(f"  swipes: {written}/{total}")
+    finally:
+        if pool:
+            pool.shutdown()
+    return written
+
+def create_matches():
+    """Insert a Match for every mutual like that does not have one yet; returns the row count."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {Match._meta.db_table} (user1_id, user2_id, created_at)
+            SELECT a.user_id, a.target_id, %s
+            FROM {Swipe._meta.db_table} a
+            JOIN {Swipe._meta.db_table} b ON b.user_id = a.target_id AND b.target_id = a.user_id
+            WHERE a.is_like AND b.is_like AND a.user_id < a.target_id
+            ON CONFLICT (user1_id, user2_id) DO NOTHING
+            """,
+            [timezone.now()],
+        )
+        return cursor.rowcount
+
+def generate(users, swipes, seed=42, chunk=50_000, like_rate=0.5, reciprocity=0.1,
+             password="benchmark", workers=0, log=print):
+    """Users, then swipes among all synthetic users, then matches. Returns counts."""
+    made = create_users(users, seed, chunk, password, workers, log) if users else 0
+    ids, genders = load_population()
+    swiped = create_swipes(ids, genders, swipes, seed, max(chunk, 10_000) * 4, like_rate, reciprocity, workers, log)
+    matched = create_matches()
+    return {"users": made, "swipes": swiped, "matches": matched, "population": len(ids)}
@@ -0,0 +1,91 @@
+import os, random, shlex, shutil, socket, subprocess, time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from benchmark import driver, report
+from benchmark.generate import load_population
+
+# {port}, {workers} and {threads} are filled in; run from the project directory
+WSGI_CMD = 'gunicorn datingapp.wsgi:application --bind 127.0.0.1:{port} --workers {workers} --threads {threads}'
+ASGI_CMD = 'uvicorn datingapp.asgi:application --port {port} --workers {workers} --no-access-log'
+
+class Command(BaseCommand):
+    help = 'Compare sync views under a WSGI server with async views under an ASGI server, same traffic'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000, help='Requests per server (default 5000)')
+        parser.add_argument('--duration', type=float, help='Run each server for this many seconds instead')
+        parser.add_argument('--concurrency', type=int, default=128, help='Concurrent virtual users (default 128)')
+        parser.add_argument(
+            '--mix',
+            default='feed=0.5,swipe=0.4,matches=0.1',
+            help='Traffic mix as endpoint=weight pairs (default feed=0.5,swipe=0.4,matches=0.1)',
+        )
+        parser.add_argument('--users', type=int, default=1000, help='Distinct synthetic users to act as (default 1000)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default 0)')
+        parser.add_argument('--port', type=int, default=8765, help='Port the servers listen on (default 8765)')
+        parser.add_argument('--workers', type=int, default=1, help='Server worker processes (default 1)')
+        parser.add_argument('--threads', type=int, default=8, help='Threads per WSGI worker (default 8)')
+        parser.add_argument('--wsgi-cmd', default=WSGI_CMD, help=f'WSGI server command (default: {WSGI_CMD})')
+        parser.add_argument('--asgi-cmd', default=ASGI_CMD, help=f'ASGI server command (default: {ASGI_CMD})')
+        parser.add_argument('--startup-timeout', type=float, default=30, help='Seconds to wait for a server (default 30)')
+        parser.add_argument('--out', metavar='PREFIX', help='Write PREFIX.wsgi.json and PREFIX.asgi.json reports')
+
+    def handle(self, *args, **options):
+        try:
+            mix = driver.parse_mix(options['mix'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        ids, _ = load_population()
+        if len(ids) < 2:
+            raise CommandError('Need at least two synthetic users. Run bench_generate first.')
+        # at least two, so random swipes always have someone else to target
+        acting = random.Random(options['seed']).sample(ids.tolist(), min(max(options['users'], 2), len(ids)))
+
+        results = {}
+        # the sync views under WSGI, then the async views under ASGI
+        for flavour, cmd, async_views in (('wsgi', options['wsgi_cmd'], '0'), ('asgi', options['asgi_cmd'], '1')):
+            argv = shlex.split(cmd.format(port=options['port'], workers=options['workers'], threads=options['threads']))
+            if shutil.which(argv[0]) is None:
+                raise CommandError(f'{argv[0]} not found (pip install gunicorn uvicorn, or pass --{flavour}-cmd)')
+            self.stdout.write(f"{flavour}: {' '.join(argv)}")
+            env = {**os.environ, 'DATING_ASYNC_VIEWS': async_views}
+            quiet = subprocess.DEVNULL if options['verbosity'] < 2 else None   # -v 2 shows server output
+            server = subprocess.Popen(argv, cwd=settings.BASE_DIR, env=env, stdout=quiet, stderr=quiet)
+            try:
+                self.wait_for_port(server, options['port'], options['startup_timeout'])
+                samples, wall = driver.run(
+                    driver.HttpTransport(f"http://127.0.0.1:{options['port']}"), acting,
+                    requests=options['requests'], concurrency=options['concurrency'],
+                    mix=mix, seed=options['seed'], duration=options['duration'],
+                )
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+            results[flavour] = report.summarize(samples, wall, meta={
+                'server': ' '.join(argv), 'async_views': async_views == '1', 'concurrency': options['concurrency'],
+                'mix': mix, 'users': len(acting), 'population': len(ids),
+            })
+            for line in report.table(results[flavour]):
+                self.stdout.write(f'  {line}')
+            if options['out']:
+                report.save(results[flavour], f"{options['out']}.{flavour}.json")
+
+        self.stdout.write('ASGI against WSGI:')
+        for line in report.compare(results['wsgi'], results['asgi']):
+            self.stdout.write(f'  {line}')
+        if options['out']:
+            self.stdout.write(self.style.SUCCESS(f"Reports written to {options['out']}.wsgi.json / .asgi.json"))
+
+    @staticmethod
+    def wait_for_port(server, port, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'Server exited with status {server.returncode}')
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f'Server did not listen on port {port} within {timeout:g}s')
@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from accounts.models import User
+from accounts.serializers import PROFILE_COLUMNS, PublicUserSerializer, profile_dicts
+from datingapp import renderers
+
+class Command(BaseCommand):
+    help = 'Public profiles per second: PublicUserSerializer + JSONRenderer against the fast feed path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--objects', type=int, default=2000, help='Profiles per run (default 2000)')
+        parser.add_argument('--page-size', type=int, default=20, help='Profiles per rendered page (default 20)')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs, best one counts (default 5)')
+
+    def handle(self, *args, **options):
+        n, size = options['objects'], max(1, options['page_size'])
+        if not User.objects.exists():
+            raise CommandError('No users. Run create_sample_data or bench_generate first.')
+        qs = User.objects.order_by('id')[:n]
+        users, rows = list(qs), list(qs.values(*PROFILE_COLUMNS))
+        n = len(users)
+        json_renderer, fast_renderer = JSONRenderer(), renderers.FastJSONRenderer()
+
+        # both without the fragment cache: this is what every cache miss costs
+        def serializer(users):
+            ser = PublicUserSerializer()
+            for i in range(0, len(users), size):
+                json_renderer.render([ser.to_representation(u) for u in users[i:i + size]])
+
+        def fast(rows):
+            for i in range(0, len(rows), size):
+                fast_renderer.render(profile_dicts(rows[i:i + size]))
+
+        cases = [
+            ('serializer', lambda: serializer(users)),
+            ('fast', lambda: fast(rows)),
+            ('serializer+fetch', lambda: serializer(list(qs.all()))),
+            ('fast+fetch', lambda: fast(list(qs.values(*PROFILE_COLUMNS)))),
+        ]
+        self.stdout.write(
+            f'{n} profiles in pages of {size}, best of {options["repeat"]}'
+            f' (orjson {"on" if renderers.orjson else "not installed"})'
+        )
+        self.stdout.write(f"{'path':<18} {'objects/s':>10} {'us/object':>10}")
+        rates = {}
+        for name, run in cases:
+            best = min(self.timed(run) for _ in range(max(1, options['repeat'])))
+            rates[name] = n / best
+            baseline = rates.get(name.replace('fast', 'serializer'))
+            speedup = f'  ({rates[name] / baseline:.1f}x)' if name.startswith('fast') else ''
+            self.stdout.write(f'{name:<18} {rates[name]:>10.0f} {best / n * 1e6:>10.1f}{speedup}')
+
+    @staticmethod
+    def timed(run):
+        started = time.perf_counter()
+        run()
+        return time.perf_counter() - started
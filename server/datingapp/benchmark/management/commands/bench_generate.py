@@ -0,0 +1,48 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from benchmark.generate import PREFIX, generate
+
+class Command(BaseCommand):
+    help = f'Generate synthetic "{PREFIX}*" users, swipes and matches for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000, help='Users to add (default 100000)')
+        parser.add_argument('--swipes', type=int, default=1000000, help='Swipes to add (default 1M)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default 42)')
+        parser.add_argument('--chunk', type=int, default=50000, help='Users per insert chunk (default 50000)')
+        parser.add_argument('--like-rate', type=float, default=0.5, help='Average share of likes (default 0.5)')
+        parser.add_argument(
+            '--reciprocity',
+            type=float,
+            default=0.1,
+            help='Chance that a like is returned, i.e. becomes a match (default 0.1)',
+        )
+        parser.add_argument(
+            '--password',
+            default='benchmark',
+            help='Password of every generated user, hashed once (default "benchmark")',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Generator processes (default: CPU count; 0 = generate in this process)',
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 0 or options['swipes'] < 0:
+            raise CommandError('--users and --swipes must be >= 0')
+        self.stdout.write(
+            f"Generating {options['users']} users and ~{options['swipes']} swipes (seed {options['seed']})..."
+        )
+        counts = generate(
+            options['users'], options['swipes'], seed=options['seed'],
+            chunk=options['chunk'], like_rate=options['like_rate'],
+            reciprocity=options['reciprocity'], password=options['password'], workers=options['workers'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Added {counts['users']} users, {counts['swipes']} swipes, {counts['matches']} matches "
+            f"({counts['population']} synthetic users in total)"
+        ))
@@ -0,0 +1,58 @@
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from benchmark import driver, report
+from benchmark.generate import load_population
+
+class Command(BaseCommand):
+    help = 'Replay mixed feed/swipe/matches traffic and report latency percentiles and throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Total requests (default 2000)')
+        parser.add_argument('--duration', type=float, help='Run for this many seconds instead of --requests')
+        parser.add_argument('--concurrency', type=int, default=4, help='Concurrent virtual users (default 4)')
+        parser.add_argument(
+            '--mix',
+            default='feed=0.5,swipe=0.4,matches=0.1',
+            help='Traffic mix as endpoint=weight pairs (default feed=0.5,swipe=0.4,matches=0.1)',
+        )
+        parser.add_argument('--users', type=int, default=1000, help='Distinct synthetic users to act as (default 1000)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default 0)')
+        parser.add_argument(
+            '--base-url',
+            help='Drive a running server over HTTP (e.g. http://127.0.0.1:8000); default is in-process',
+        )
+        parser.add_argument('--out', help='Write the JSON report here')
+        parser.add_argument('--compare', help='Print the change against an earlier JSON report')
+
+    def handle(self, *args, **options):
+        try:
+            mix = driver.parse_mix(options['mix'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        ids, _ = load_population()
+        if len(ids) < 2:
+            raise CommandError('Need at least two synthetic users. Run bench_generate first.')
+        # at least two, so random swipes always have someone else to target
+        acting = random.Random(options['seed']).sample(ids.tolist(), min(max(options['users'], 2), len(ids)))
+
+        transport = driver.HttpTransport(options['base_url']) if options['base_url'] else driver.ClientTransport()
+        self.stdout.write(f"Driving {transport.label} transport with {options['concurrency']} workers...")
+        samples, wall = driver.run(
+            transport, acting, requests=options['requests'], concurrency=options['concurrency'],
+            mix=mix, seed=options['seed'], duration=options['duration'],
+        )
+        result = report.summarize(samples, wall, meta={
+            'transport': transport.label, 'concurrency': options['concurrency'], 'mix': mix,
+            'users': len(acting), 'population': len(ids),
+        })
+
+        for line in report.table(result):
+            self.stdout.write(line)
+        if options['out']:
+            report.save(result, options['out'])
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['out']}"))
+        if options['compare']:
+            self.stdout.write(f"Against {options['compare']}:")
+            for line in report.compare(report.load(options['compare']), result):
+                self.stdout.write(f'  {line}')
@@ -0,0 +1,74 @@
+import os, time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import hashers
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+from accounts.authentication import tokens_for
+from accounts.models import User
+
+# what a login used to cost, and what the tuned hashers cost now
+HASHERS = {
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'scrypt-django': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'scrypt': 'accounts.hashers.TunedScryptPasswordHasher',
+    'argon2': 'accounts.hashers.TunedArgon2PasswordHasher',
+}
+
+class Command(BaseCommand):
+    help = 'Logins per second (password check + token pair) per hasher, per core'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hashers',
+            default=','.join(HASHERS),
+            help=f'Comma-separated hashers to compare (default {",".join(HASHERS)})',
+        )
+        parser.add_argument('--logins', type=int, default=20, help='Logins per hasher (default 20)')
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Logins in parallel, i.e. hashing pool size (default: CPU count)',
+        )
+
+    def handle(self, *args, **options):
+        names = [name for name in options['hashers'].split(',') if name]
+        unknown = set(names) - set(HASHERS)
+        if unknown:
+            raise CommandError(f"Unknown hasher(s): {', '.join(sorted(unknown))}")
+        threads = max(1, options['threads'])
+        cores = min(threads, os.cpu_count() or 1)
+        user = User(id=1, username='bench')
+
+        self.stdout.write(f"{options['logins']} logins per hasher over {threads} threads ({cores} cores)")
+        self.stdout.write(f"{'hasher':<14} {'ms/login':>9} {'logins/s':>9} {'per core':>9}")
+        baseline = None
+        for name in names:
+            hasher = import_string(HASHERS[name])()
+            try:
+                encoded = hasher.encode('correct horse battery', hasher.salt())
+            except ValueError as e:   # argon2-cffi missing
+                self.stdout.write(f'{name:<14} skipped: {e}')
+                continue
+
+            def login(_):
+                started = time.perf_counter()
+                if not hasher.verify('correct horse battery', encoded):
+                    raise CommandError(f'{name} did not verify its own hash')
+                refresh = tokens_for(user)
+                str(refresh), str(refresh.access_token)
+                return time.perf_counter() - started
+
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                started = time.perf_counter()
+                latencies = list(pool.map(login, range(options['logins'])))
+                wall = time.perf_counter() - started
+            rate = options['logins'] / wall
+            baseline = baseline or rate
+            self.stdout.write(
+                f'{name:<14} {sum(latencies) / len(latencies) * 1000:>9.1f} {rate:>9.1f} {rate / cores:>9.1f}'
+                f'  ({rate / baseline:.1f}x {names[0]})'
+            )
+        preferred = hashers.get_hasher()
+        self.stdout.write(f'Current default: {preferred.__class__.__name__} ({preferred.algorithm})')
@@ -0,0 +1,62 @@
+from datetime import date
+import statistics
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from dating import candidates
+from dating.recommend import VectorizedRecommender, score_block, top_k_indices
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Benchmark the vectorized feed scorer on a synthetic candidate block'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--candidates', type=int, default=100000, help='Block size to score (default 100000)')
+        parser.add_argument('--k', type=int, default=20, help='Top-K to select (default 20)')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs (default 20)')
+        parser.add_argument('--target-ms', type=float, default=50.0, help='Latency budget per block (default 50 ms)')
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            help='Also time the full DB-backed top_k() for this user',
+        )
+
+    def handle(self, *args, **options):
+        n, k = options['candidates'], options['k']
+        rng = np.random.default_rng(7)
+        today = date.today().toordinal()
+        masks = rng.integers(0, 32, size=n, dtype=np.uint8)        # up to 5 shared tokens
+        births = today - rng.integers(18 * 365, 45 * 365, size=n)
+        idle = rng.exponential(20.0, size=n).astype(np.float32)
+        liked = rng.random(n) < 0.05
+        weights = VectorizedRecommender.weights
+
+        timings = []
+        for _ in range(options['repeat'] + 1):
+            started = time.perf_counter()
+            scores = score_block(masks, 5, births, today - 27 * 365, idle, liked, weights)
+            top_k_indices(scores, k)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings = sorted(timings[1:])  # drop the warm-up run
+        p50 = statistics.median(timings)
+        self.report(f'score + top-{k} over {n} candidates', p50, timings[-1], options['target_ms'])
+
+        if options['user_id']:
+            try:
+                me = User.objects.get(id=options['user_id'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user_id']} not found")
+            engine = VectorizedRecommender()
+            engine.block_size = n
+            started = time.perf_counter()
+            engine.top_k(me, candidates.unswiped_qs(me), k)
+            elapsed = (time.perf_counter() - started) * 1000
+            self.stdout.write(f'DB-backed top_k for user {me.id} (fetch + score + hydrate): {elapsed:.1f} ms')
+
+    def report(self, label, p50, worst, target):
+        line = f'{label}: p50 {p50:.2f} ms, max {worst:.2f} ms (target {target:.0f} ms)'
+        style = self.style.SUCCESS if p50 <= target else self.style.ERROR
+        self.stdout.write(style(line))
@@ -0,0 +1,106 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Q, Count
+from benchmark.generate import PREFIX, generate
+from dating.models import Swipe, Match
+from dating import candidates
+
+User = get_user_model()
+
+# Swipe needs no index beyond its (user, target) unique constraint, which every query here can use
+INDEXES = {
+    Match: ['match_user1_created_idx', 'match_user2_created_idx'],
+}
+
+class Command(BaseCommand):
+    help = 'Show query plans and latency of the swipe/match hot queries with and without their indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            action='store_true',
+            help=f'First insert synthetic "{PREFIX}*" users, swipes and matches (benchmark.generate)',
+        )
+        parser.add_argument('--users', type=int, default=20000, help='Synthetic users to seed (default 20000)')
+        parser.add_argument('--swipes', type=int, default=1000000, help='Synthetic swipes to seed (default 1M)')
+        parser.add_argument('--repeat', type=int, default=50, help='Timed runs per query (default 50)')
+        parser.add_argument('--user-id', type=int, help='Run the queries as this user (default: busiest swiper)')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            generate(options['users'], options['swipes'], seed=42, log=self.stdout.write)
+
+        me = self.pick_user(options['user_id'])
+        self.stdout.write(
+            f'{Swipe.objects.count()} swipes, {Match.objects.count()} matches; running as user {me.id}'
+        )
+        others = list(
+            Swipe.objects.filter(user=me, is_like=True).values_list('target_id', flat=True)[:options['repeat']]
+        ) or [me.id]
+
+        # fresh connections around each phase so no statement prepared against
+        # the other schema is reused from the driver's statement cache
+        connection.close()
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                for names in INDEXES.values():
+                    for name in names:
+                        cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+            without_idx = self.run_queries(me, others, options['repeat'])
+            transaction.set_rollback(True)  # indexes come back
+        connection.close()
+        with_idx = self.run_queries(me, others, options['repeat'])
+
+        for name, (plan, p50, p95) in with_idx.items():
+            old_plan, old_p50, old_p95 = without_idx[name]
+            self.stdout.write('')
+            self.stdout.write(self.style.WARNING(name))
+            self.stdout.write(f'  without indexes: p50 {old_p50:.3f} ms  p95 {old_p95:.3f} ms')
+            self.stdout.write(self.indent(old_plan))
+            self.stdout.write(self.style.SUCCESS(f'  with indexes:    p50 {p50:.3f} ms  p95 {p95:.3f} ms'))
+            self.stdout.write(self.indent(plan))
+
+    def pick_user(self, user_id):
+        if user_id:
+            try:
+                return User.objects.get(id=user_id)
+            except User.DoesNotExist:
+                raise CommandError(f'User {user_id} not found')
+        busiest = (
+            Swipe.objects.values('user_id').order_by().annotate(n=Count('id')).order_by('-n').first()
+        )
+        if not busiest:
+            raise CommandError('No swipes in the database. Run with --seed first.')
+        return User.objects.get(id=busiest['user_id'])
+
+    def run_queries(self, me, others, repeat):
+        queries = {
+            # the SELECT inside Swipe.record_many's match INSERT after `me` likes `other`
+            'reciprocal likes (target=me, is_like, user IN liked)': lambda other: (
+                Swipe.objects.filter(target=me, is_like=True, user_id__in=[other]).values_list('user_id', flat=True)),
+            'matches page (user1|user2 = me by -created_at)': lambda other: (
+                Match.objects.filter(Q(user1=me) | Q(user2=me)).order_by('-created_at')[:20]),
+            'feed page (NOT EXISTS anti-join)': lambda other: (
+                candidates.unswiped_qs(me).order_by('id')[:20]),
+        }
+        out = {}
+        for name, build in queries.items():
+            plan = build(others[0]).explain()
+            list(build(others[0]))  # warm the page cache
+            timings = []
+            for i in range(repeat):
+                qs = build(others[i % len(others)])
+                started = time.perf_counter()
+                list(qs)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            out[name] = (plan, statistics.median(timings), timings[max(int(len(timings) * 0.95) - 1, 0)])
+        return out
+
+    @staticmethod
+    def indent(text):
+        return '\n'.join(f'    {line}' for line in text.splitlines())
@@ -0,0 +1,80 @@
+# benchmark/report.py
+"""Latency / throughput summaries of driver runs, saved as JSON for comparing runs."""
+import json, platform
+from collections import defaultdict
+from datetime import datetime, timezone
+
+def percentile(sorted_values, q):
+    """Linear-interpolated percentile (q in 0..100) of an already sorted list."""
+    if not sorted_values:
+        return None
+    pos = (len(sorted_values) - 1) * q / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+def _stats(timings, errors, wall_seconds):
+    timings = sorted(timings)
+    return {
+        "count": len(timings),
+        "errors": errors,
+        "throughput_rps": round(len(timings) / wall_seconds, 2) if wall_seconds else None,
+        "mean_ms": round(sum(timings) / len(timings), 3) if timings else None,
+        "p50_ms": _ms(percentile(timings, 50)),
+        "p95_ms": _ms(percentile(timings, 95)),
+        "p99_ms": _ms(percentile(timings, 99)),
+        "max_ms": _ms(timings[-1] if timings else None),
+    }
+
+def _ms(value):
+    return None if value is None else round(value, 3)
+
+def summarize(samples, wall_seconds, meta=None):
+    """samples: (endpoint, milliseconds, status) tuples from driver.run(). Non-2xx counts as an error."""
+    by_endpoint, errors = defaultdict(list), defaultdict(int)
+    for endpoint, ms, status in samples:
+        by_endpoint[endpoint].append(ms)
+        if not 200 <= status < 300:
+            errors[endpoint] += 1
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "wall_seconds": round(wall_seconds, 3),
+        "meta": meta or {},
+        "total": _stats([s[1] for s in samples], sum(errors.values()), wall_seconds),
+        "endpoints": {
+            name: _stats(timings, errors[name], wall_seconds) for name, timings in sorted(by_endpoint.items())
+        },
+    }
+
+def table(report):
+    """Per-endpoint count / errors / rps / p50 / p95 / p99 rows, plus a total row. Missing numbers show as "-"."""
+    lines = [f"{'endpoint':<8} {'count':>7} {'errors':>6} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9}"]
+    for name, row in [*report["endpoints"].items(), ("total", report["total"])]:
+        rps, p50, p95, p99 = (
+            "-" if row[key] is None else row[key] for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+        )
+        lines.append(
+            f"{name:<8} {row['count']:>7} {row['errors']:>6} {rps:>8} {p50:>9} {p95:>9} {p99:>9}"
+        )
+    return lines
+
+def save(report, path):
+    with open(path, "w") as fh:
+        json.dump(report, fh, indent=2)
+
+def load(path):
+    with open(path) as fh:
+        return json.load(fh)
+
+def compare(old, new):
+    """Lines like 'feed p95_ms 12.1 -> 9.8 (-19.0%)' for every endpoint both reports have."""
+    lines = []
+    for name in sorted(set(old["endpoints"]) & set(new["endpoints"])):
+        for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            a, b = old["endpoints"][name][key], new["endpoints"][name][key]
+            if a is None or b is None:
+                continue
+            change = f"{(b - a) / a * 100:+.1f}%" if a else "n/a"
+            lines.append(f"{name:<8} {key:<15} {a:>10.3f} -> {b:>10.3f} ({change})")
+    return lines
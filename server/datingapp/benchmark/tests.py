@@ -0,0 +1,65 @@
+import random
+
+from django.core.cache import cache
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+
+from accounts.models import User, UserLike
+from dating.models import Match, Swipe
+from . import driver, report
+from .generate import PREFIX, generate, load_population, next_suffix
+
+class GenerateTests(TestCase):
+    def test_population_is_seeded_and_consistent(self):
+        counts = generate(200, 2000, seed=1, chunk=64, log=lambda msg: None)
+        self.assertEqual(counts["users"], 200)
+        self.assertEqual(User.objects.filter(username__startswith=PREFIX).count(), 200)
+        self.assertGreater(Swipe.objects.count(), 1500)
+        self.assertFalse(Swipe.objects.filter(user=F("target")).exists())
+        self.assertEqual(counts["matches"], Match.objects.count())
+        # bulk inserts skip signals, so the like index is written explicitly
+        user = User.objects.exclude(likes=[]).first()
+        self.assertEqual(set(UserLike.objects.filter(user=user).values_list("token", flat=True)), set(user.likes))
+
+    def test_names_continue_after_deletions(self):
+        generate(12, 0, seed=1, log=lambda msg: None)
+        User.objects.filter(username__in=[f"{PREFIX}3", f"{PREFIX}5"]).delete()
+        User.objects.create_user(username=f"{PREFIX}admin", password="x")
+        self.assertEqual(next_suffix(), 12)
+        self.assertEqual(generate(4, 0, seed=2, log=lambda msg: None)["users"], 4)
+        self.assertTrue(User.objects.filter(username=f"{PREFIX}15").exists())
+
+class DriverTests(TransactionTestCase):
+    # the driver's worker threads use their own connections, so the data must be committed
+    def test_client_transport_run(self):
+        cache.clear()
+        generate(40, 200, seed=2, log=lambda msg: None)
+        ids, _ = load_population()
+        samples, wall = driver.run(driver.ClientTransport(), ids.tolist(), requests=30, concurrency=1)
+        self.assertEqual(len(samples), 30)
+        self.assertTrue(all(status in (200, 201) for _, _, status in samples), samples)
+        summary = report.summarize(samples, wall)
+        self.assertEqual(summary["total"]["count"], 30)
+        self.assertEqual(summary["total"]["errors"], 0)
+
+class ReportTests(SimpleTestCase):
+    def test_percentiles(self):
+        values = list(range(1, 101))
+        self.assertEqual(report.percentile(values, 50), 50.5)
+        self.assertEqual(report.percentile(values, 99), 99.01)
+        self.assertIsNone(report.percentile([], 50))
+
+    def test_table_renders_missing_numbers_as_dash(self):
+        lines = report.table(report.summarize([], 0))
+        self.assertEqual(lines[-1].split(), ["total", "0", "0", "-", "-", "-", "-"])
+
+    def test_random_swipe_target_is_never_self(self):
+        rng = random.Random(0)
+        self.assertTrue(all(driver._other(rng, [1, 2], 1) == 2 for _ in range(50)))
+        with self.assertRaises(ValueError):
+            driver.run(driver.ClientTransport(), [7, 7], requests=1)
+
+    def test_parse_mix(self):
+        self.assertEqual(driver.parse_mix("feed=3,swipe"), {"feed": 3.0, "swipe": 1.0})
+        with self.assertRaises(ValueError):
+            driver.parse_mix("nope=1")
@@ -0,0 +1,174 @@
+# dating/async_views.py
+"""
+Async (ASGI-native) versions of the feed, swipe and matches endpoints.
+
+Same URLs, request and response shapes as the DRF views in views.py, but
+written as plain async Django views: under an ASGI server a request waiting on
+the database no longer holds a worker thread. Selected in dating/urls.py when
+settings.DATING_ASYNC_VIEWS is on (DATING_ASYNC_VIEWS=1 in the environment).
+
+- Authentication is ClaimsJWTAuthentication's: the token's claims, or an async
+  user lookup when they are stale.
+- Reads go through the async ORM (async for / aget / afirst).
+- Writes that need a transaction (Swipe.record_many) run in one sync_to_async
+  call: Django's async ORM has no async transactions.
+- Bodies are rendered with FastJSONRenderer (DRF's JSONRenderer output, via
+  orjson), so both flavours return the same bytes.
+Under WSGI these views still work; Django runs them in an event loop per
+request, which only adds overhead, so keep the DRF views there.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+
+from accounts.authentication import ClaimsJWTAuthentication
+from accounts.serializers import PROFILE_COLUMNS, public_profiles
+from datingapp import routers
+from datingapp.conditional import conditional
+from datingapp.renderers import FastJSONRenderer
+from . import candidates
+from .models import Swipe
+from .pagination import KeysetPagination, MatchesPagination
+from .recommend import get_recommender
+from .serializers import SwipeCreateSerializer, MatchSerializer, FeedUserSerializer
+from .views import _annotate_swipe_targets, matches_qs
+
+User = get_user_model()
+
+_jwt = ClaimsJWTAuthentication()
+_renderer = FastJSONRenderer()
+
+def json_response(data, status=200, headers=None):
+    return HttpResponse(_renderer.render(data), status=status, headers=headers, content_type="application/json")
+
+async def authenticate(request):
+    """
+    The requesting user from the Bearer token (sets request.user), or raises
+    rest_framework.exceptions.AuthenticationFailed / NotAuthenticated.
+    """
+    request.user = AnonymousUser()   # never fall back to the lazy, sync session user
+    header = _jwt.get_header(request)
+    raw = _jwt.get_raw_token(header) if header is not None else None
+    if raw is None:
+        raise exceptions.NotAuthenticated()
+    request.user = await _jwt.aget_user(_jwt.get_validated_token(raw))
+    return request.user
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncAPIView(View):
+    """JWT-authenticated async view; handlers get (request, me) and return a response."""
+    http_method_names = ["get", "post", "head"]
+    replica_reads = False
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            me = await authenticate(request)
+            handler = getattr(self, request.method.lower(), None)
+            if request.method.lower() not in self.http_method_names or handler is None:
+                raise exceptions.MethodNotAllowed(request.method)
+            if not (self.replica_reads and request.method in ("GET", "HEAD") and routers.replica_configured()):
+                return await handler(request, me, *args, **kwargs)
+            with routers.replica_reads(not await routers.ais_pinned(me.pk)):
+                return await handler(request, me, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.handle_exception(exc)
+
+    @staticmethod
+    def handle_exception(exc):
+        # the same bodies and statuses DRF's exception handler produces
+        data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            return json_response(data, status=401, headers={"WWW-Authenticate": _jwt.authenticate_header(None)})
+        return json_response(data, status=exc.status_code)
+
+    @staticmethod
+    def parse(request, serializer_class):
+        if request.content_type != "application/json":
+            data = request.POST   # form posts, as DRF's default parsers accept
+        else:
+            try:
+                data = json.loads(request.body or b"{}")
+            except ValueError as e:
+                raise exceptions.ParseError(f"JSON parse error - {e}")
+        ser = serializer_class(data=data)
+        ser.is_valid(raise_exception=True)
+        return ser.validated_data
+    # Minimal async stand-in for APIView: JWT auth, JSON in/out, DRF error bodies
+
+class FeedView(AsyncAPIView):
+    """Async FeedView: same queue / cursor / ?rank behaviour, response and ETags."""
+    replica_reads = True
+
+    @conditional("feed", "profile", "swipes")
+    async def get(self, request, me):
+        page_size = KeysetPagination.page_size
+        rank = request.GET.get("rank")
+        if rank == "interests":
+            ranked = await sync_to_async(candidates.interest_ranked)(me, page_size)
+            return json_response(FeedUserSerializer(ranked, many=True).data)
+        if rank == "recommended":
+            top_k = get_recommender().top_k
+            ranked = await sync_to_async(top_k)(me, candidates.unswiped_qs(me), page_size)
+            return json_response(FeedUserSerializer(ranked, many=True).data)
+        paginator = KeysetPagination()
+        if paginator.cursor_query_param not in request.GET:
+            queued = await candidates.apeek(me, page_size, fields=PROFILE_COLUMNS)
+            if queued:
+                return json_response(public_profiles(queued))
+        page = await paginator.apaginate_queryset(candidates.unswiped_qs(me).values(*PROFILE_COLUMNS), request)
+        return json_response(public_profiles(page), headers=paginator.next_headers())
+
+def _record_swipe(user_id, target_id, is_like):
+    """The write half of a swipe, run in one worker-thread hop."""
+    new_match_id = Swipe.record(user_id, target_id, is_like)
+    candidates.drain(user_id, target_id)
+    routers.pin_to_primary(user_id)
+    return new_match_id
+
+class SwipeView(AsyncAPIView):
+    """Async SwipeView: lookup through the async ORM, upsert + match in one transaction."""
+    async def post(self, request, me):
+        data = self.parse(request, SwipeCreateSerializer)
+        target_id, is_like = data["target_id"], data["action"] == "like"
+        if target_id == me.id:
+            return json_response({"detail": "Cannot swipe yourself."}, status=400)
+
+        target = await (
+            _annotate_swipe_targets(User.objects.filter(id=target_id), me)
+            .values("liked_me", "match_id")
+            .afirst()
+        )
+        if target is None:
+            return json_response({"detail": "Target not found."}, status=404)
+
+        new_match_id = await sync_to_async(_record_swipe)(me.id, target_id, is_like)
+        matched, match_id = False, None
+        if new_match_id is not None:
+            matched, match_id = True, new_match_id
+        elif is_like and target["liked_me"] and target["match_id"]:
+            matched, match_id = True, target["match_id"]  # re-like of an existing match
+
+        next_payload = None
+        if data["next"]:
+            queued = await candidates.apeek(me, 1)
+            next_user = queued[0] if queued else await candidates.unswiped_qs(me).order_by("id").afirst()
+            next_payload = FeedUserSerializer(next_user).data if next_user else None
+        return json_response({"matched": matched, "match_id": match_id, "next": next_payload})
+
+class MatchesListView(AsyncAPIView):
+    """Async MatchesListView: the same single JOINed query per page, and ETags."""
+    replica_reads = True
+
+    @conditional("matches", "matches")
+    async def get(self, request, me):
+        paginator = MatchesPagination()
+        page = await paginator.apaginate_queryset(matches_qs(me), request)
+        data = MatchSerializer(page, many=True, context={"request": request}).data
+        return json_response(data, headers=paginator.next_headers())
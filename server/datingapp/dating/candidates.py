@@ -0,0 +1,191 @@
+# dating/candidates.py
+"""
+Candidate selection for the swipe feed, plus the precomputed per-user queue.
+
+The queue is a short list of candidate ids per active user, stored in a Django
+cache backend (pick the alias with settings.DATING_CANDIDATE_QUEUE["CACHE"]).
+It is filled in bulk by `manage.py refill_candidate_queues`, drained as the user
+swipes and dropped when the owner is deleted or changes gender or age range
+through the profile endpoint (MeSerializer). Entries are always re-checked
+against the DB and the owner's current preferences when served, so a candidate
+who deleted their account, changed gender or was already swiped simply falls
+out of the page, and other edits (e.g. the admin) cannot surface a wrong one.
+
+The queue needs a cache shared by the refill job and every web worker (Redis,
+Memcached, DatabaseCache). On a process-local LocMemCache the refill job's
+queues would be invisible to the workers, so the queue stays off there: peek()
+finds nothing and the feed queries the DB. ALLOW_LOCAL turns it on anyway
+(tests, single-process experiments).
+"""
+from datetime import date
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Count, Exists, OuterRef, Q
+
+from accounts.models import birth_date_bounds, UserLike
+from datingapp.sharedcache import is_shared
+from .models import Swipe
+
+User = get_user_model()
+
+QUEUE_DEFAULTS = {"CACHE": "default", "SIZE": 200, "TIMEOUT": 6 * 60 * 60, "ALLOW_LOCAL": False}
+
+def opposite_gender_qs(me):
+    """
+    Returns a base queryset of candidates filtered by opposite gender:
+      - male  -> gender='female'
+      - female-> gender='male'
+      - other/blank -> no gender filter (show everyone)
+    (You already require gender at signup; this just keeps workshops safe.)
+    """
+    desired = None
+    if getattr(me, "gender", None) == "male":
+        desired = "female"
+    elif getattr(me, "gender", None) == "female":
+        desired = "male"
+
+    qs = User.objects.exclude(id=me.id)
+    if desired:
+        qs = qs.filter(gender=desired)
+    return qs
+    # helper: return candidate users filtered by opposite gender preference
+
+def age_range_qs(qs, me, today=None):
+    """
+    Apply me.min_age_pref / me.max_age_pref as birth_date bounds, computed once
+    here so the DB does the filtering on the indexed birth_date column.
+    """
+    earliest, latest = birth_date_bounds(
+        getattr(me, "min_age_pref", None), getattr(me, "max_age_pref", None), today or date.today()
+    )
+    if latest is not None:
+        qs = qs.filter(birth_date__lte=latest)
+    if earliest is not None:
+        qs = qs.filter(birth_date__gt=earliest)
+    return qs
+    # helper: restrict candidates to the user's preferred age range
+
+def unswiped_qs(me):
+    """
+    Candidates `me` has not swiped on yet, as a correlated NOT EXISTS anti-join.
+    The probe is served by the (user, target) unique index on Swipe, so the
+    cost per candidate row is constant instead of materialising every swiped id.
+    """
+    already_swiped = Swipe.objects.filter(user=me, target=OuterRef("pk"))
+    return age_range_qs(opposite_gender_qs(me), me).filter(~Exists(already_swiped))
+    # helper: opposite-gender, in-age-range candidates minus everyone already swiped
+
+def interest_ranked(me, limit):
+    """
+    Up to `limit` unswiped candidates ordered by how many like tokens they share
+    with `me` (ties by id), topped up with non-overlapping candidates by id.
+    The overlap is counted in SQL from the UserLike posting lists of my tokens
+    only, so no candidate's likes JSON is loaded or scanned. Two queries at most.
+    """
+    tokens = list(me.likes or [])
+    ranked = []
+    if tokens:
+        sharing = UserLike.objects.filter(token__in=tokens).values("user_id")
+        ranked = list(
+            unswiped_qs(me)
+            .filter(id__in=sharing)
+            .annotate(shared_likes=Count("like_tokens", filter=Q(like_tokens__token__in=tokens)))
+            .order_by("-shared_likes", "id")[:limit]
+        )
+    if len(ranked) < limit:
+        seen = [u.id for u in ranked]
+        ranked += list(unswiped_qs(me).exclude(id__in=seen).order_by("id")[:limit - len(ranked)])
+    return ranked
+
+def _conf():
+    return {**QUEUE_DEFAULTS, **getattr(settings, "DATING_CANDIDATE_QUEUE", {})}
+
+def _cache():
+    return caches[_conf()["CACHE"]]
+
+def _key(user_id):
+    return f"dating:candq:{user_id}"
+
+def enabled():
+    """Whether the queue is in use: its cache is shared between processes, or ALLOW_LOCAL is set."""
+    conf = _conf()
+    return conf["ALLOW_LOCAL"] or is_shared(conf["CACHE"])
+
+# The owner's fields that decide who is in their queue; MeSerializer drops the queue when they change
+QUEUE_INPUTS = ("gender", "min_age_pref", "max_age_pref")
+
+# The User fields compute_queue() reads (filters and recommender); load these for bulk refills
+QUEUE_USER_FIELDS = ("id", "gender", "birth_date", "min_age_pref", "max_age_pref", "likes")
+
+def compute_queue(me, size=None):
+    """Candidate ids for `me`, best first according to the configured recommender."""
+    from .recommend import get_recommender
+    size = size or _conf()["SIZE"]
+    return [u.id for u in get_recommender().top_k(me, unswiped_qs(me), size)]
+
+def store_queues(queues):
+    """Bulk-store {user_id: [candidate ids]} with one cache round trip."""
+    if not enabled():
+        raise ImproperlyConfigured("The candidate queue needs a shared cache (see DATING_CANDIDATE_QUEUE).")
+    conf = _conf()
+    _cache().set_many({_key(uid): ids for uid, ids in queues.items()}, conf["TIMEOUT"])
+
+def peek(me, limit, fields=None):
+    """
+    Up to `limit` queued candidates for `me` as User objects (queue order),
+    or None when the user has no queue and the caller should query the DB.
+    With `fields` (including "id"), the candidates are .values(*fields) rows instead.
+    """
+    ids = _cache().get(_key(me.id)) if enabled() else None
+    if not ids:
+        return None
+    head = ids[:limit]
+    if fields:
+        users = {row["id"]: row for row in unswiped_qs(me).filter(id__in=head).values(*fields)}
+    else:
+        users = unswiped_qs(me).in_bulk(head)
+    return [users[i] for i in head if i in users]
+
+async def apeek(me, limit, fields=None):
+    """peek() for async views: async cache read and async ORM."""
+    ids = await _cache().aget(_key(me.id)) if enabled() else None
+    if not ids:
+        return None
+    head = ids[:limit]
+    qs = unswiped_qs(me).filter(id__in=head)
+    if fields:
+        users = {row["id"]: row async for row in qs.values(*fields)}
+    else:
+        users = {u.id: u async for u in qs}
+    return [users[i] for i in head if i in users]
+
+def drain(user_id, target_id):
+    """Remove a swiped candidate from the owner's queue (usually the head)."""
+    drain_many(user_id, [target_id])
+
+def drain_many(user_id, target_ids):
+    """Remove several swiped candidates with one cache read and one write."""
+    if not enabled():
+        return
+    cache, key = _cache(), _key(user_id)
+    ids = cache.get(key)
+    if not ids:
+        return
+    gone = set(target_ids)
+    if len(gone) == 1 and ids[0] in gone:
+        kept = ids[1:]
+    else:
+        kept = [i for i in ids if i not in gone]
+    if len(kept) == len(ids):
+        return
+    if kept:
+        cache.set(key, kept, _conf()["TIMEOUT"])
+    else:
+        cache.delete(key)
+
+def invalidate(*user_ids):
+    if user_ids:
+        _cache().delete_many([_key(uid) for uid in user_ids])
@@ -1,7 +1,10 @@
-from django.db import models
+from django.db import models, connection, transaction
 from django.conf import settings
+from django.utils import timezone
 from django.core.exceptions import ValidationError
 
+from datingapp import conditional
+
 User = settings.AUTH_USER_MODEL
 
 class Swipe(models.Model):
@@ -11,12 +14,76 @@ class Swipe(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
+        # also serves "did I swipe X" and record_many's reciprocal-like lookups (point probes on both columns)
         unique_together = ("user","target")
 
     def clean(self):
         if self.user_id == self.target_id:
             raise ValidationError("Cannot swipe on yourself.")
 
+    @staticmethod
+    def record(user_id, target_id, is_like):
+        """Record one swipe; returns the id of a newly created Match, else None."""
+        return Swipe.record_many(user_id, {target_id: is_like}).get(target_id)
+
+    @staticmethod
+    def record_many(user_id, actions):
+        """
+        Atomically upsert swipes {target_id: is_like} by `user_id` and create the
+        Match for every like that is already reciprocated.
+        Returns {target_id: match_id} for matches created by this call.
+
+        One transaction, three statements at most:
+          1. (PostgreSQL) transaction-scoped advisory locks on each user pair
+          2. INSERT ... ON CONFLICT (user, target) DO UPDATE for the swipes
+          3. INSERT INTO match SELECT <reciprocal likes> ON CONFLICT DO NOTHING RETURNING
+        Two users liking each other at the same moment are serialised on the
+        pair (PostgreSQL: advisory lock; SQLite: the single-writer lock, since
+        the first statement is a write), so exactly one of them creates the
+        Match and neither sees an IntegrityError. Needs RETURNING support
+        (SQLite >= 3.35 or PostgreSQL).
+        """
+        if not actions:
+            return {}
+        liked = [tid for tid, like in actions.items() if like]
+        with transaction.atomic(savepoint=False), connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                keys = sorted(_pair_lock_key(user_id, tid) for tid in actions)
+                cursor.execute(
+                    "SELECT pg_advisory_xact_lock(k) FROM (SELECT unnest(%s::bigint[]) AS k ORDER BY k) AS keys",
+                    [keys],
+                )
+            Swipe.objects.bulk_create(
+                [Swipe(user_id=user_id, target_id=tid, is_like=like) for tid, like in actions.items()],
+                update_conflicts=True, unique_fields=["user", "target"], update_fields=["is_like"],
+            )
+            conditional.bump("swipes", user_id)
+            if not liked:
+                return {}
+            now = connection.ops.adapt_datetimefield_value(timezone.now())
+            cursor.execute(
+                f"""
+                INSERT INTO {Match._meta.db_table} (user1_id, user2_id, created_at)
+                SELECT CASE WHEN s.user_id < %s THEN s.user_id ELSE %s END,
+                       CASE WHEN s.user_id < %s THEN %s ELSE s.user_id END,
+                       %s
+                FROM {Swipe._meta.db_table} s
+                WHERE s.target_id = %s AND s.is_like AND s.user_id IN ({", ".join(["%s"] * len(liked))})
+                ON CONFLICT (user1_id, user2_id) DO NOTHING
+                RETURNING id, user1_id, user2_id
+                """,
+                [user_id, user_id, user_id, user_id, now, user_id, *liked],
+            )
+            created = {(u2 if u1 == user_id else u1): mid for mid, u1, u2 in cursor.fetchall()}
+            if created:
+                conditional.bump("matches", user_id, *created)
+            return created
+    # Swipe + mutual-match detection as one race-safe primitive
+
+def _pair_lock_key(a, b):
+    lo, hi = (a, b) if a < b else (b, a)
+    return ((lo << 32) ^ hi) & 0x7FFFFFFFFFFFFFFF  # collisions only over-serialise
+
 class Match(models.Model):
     user1 = models.ForeignKey(User, on_delete=models.CASCADE, related_name="matches_as_user1")
     user2 = models.ForeignKey(User, on_delete=models.CASCADE, related_name="matches_as_user2")
@@ -24,10 +91,16 @@ class Match(models.Model):
 
     class Meta:
         unique_together = ("user1","user2")
+        indexes = [
+            # matches list: (user1=me OR user2=me) ORDER BY created_at DESC
+            models.Index(fields=["user1", "-created_at"], name="match_user1_created_idx"),
+            models.Index(fields=["user2", "-created_at"], name="match_user2_created_idx"),
+        ]
 
     @staticmethod
     def create_sorted(a, b):
         if a.id == b.id: raise ValidationError("Cannot match with yourself.")
         u1, u2 = (a, b) if a.id < b.id else (b, a)
-        obj, _ = Match.objects.get_or_create(user1=u1, user2=u2)
-        return obj
+        # INSERT ... ON CONFLICT DO NOTHING: no SELECT-then-INSERT race, no IntegrityError
+        Match.objects.bulk_create([Match(user1=u1, user2=u2)], ignore_conflicts=True)
+        return Match.objects.get(user1=u1, user2=u2)
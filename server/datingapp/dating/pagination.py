@@ -0,0 +1,99 @@
+# dating/pagination.py
+import base64, binascii, json
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+def encode_cursor(*values):
+    """Opaque cursor token for the last-served key(s) (clients must not parse it)."""
+    raw = json.dumps(values[0] if len(values) == 1 else list(values), default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(token):
+    """Inverse of encode_cursor, always as a list; raises NotFound for anything malformed."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise NotFound("Invalid cursor.")
+    values = values if isinstance(values, list) else [values]
+    # keys are scalars (ids, ISO timestamps); anything else is not one of our cursors
+    if not all(isinstance(v, (str, int, float)) and not isinstance(v, bool) for v in values):
+        raise NotFound("Invalid cursor.")
+    return values
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination on a unique ordering, with an opaque cursor.
+    - ?cursor=<token> continues after the last row of the previous page
+    - the body stays a plain list (same shape as before pagination existed);
+      the next cursor travels in the X-Next-Cursor header and a Link rel="next"
+    - `keys` is the ordering, most significant first; the last key must be unique
+    Each page is a single indexed range scan: WHERE keys > :last ORDER BY keys LIMIT n,
+    so the cost does not grow with how deep the client has paged.
+    """
+    page_size = 20
+    cursor_query_param = "cursor"
+    keys = ("id",)
+    descending = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        return self._finish(list(self._page(queryset, request.query_params)))
+
+    async def apaginate_queryset(self, queryset, request):
+        """The same page through the async ORM, for a plain (non-DRF) async view."""
+        self.request = request
+        return self._finish([obj async for obj in self._page(queryset, request.GET)])
+
+    def _page(self, queryset, params):
+        token = params.get(self.cursor_query_param)
+        if token:
+            queryset = queryset.filter(self._after(queryset.model, decode_cursor(token)))
+        prefix = "-" if self.descending else ""
+        return queryset.order_by(*[prefix + k for k in self.keys])[:self.page_size]
+
+    def _finish(self, page):
+        self.next_cursor = None
+        if len(page) == self.page_size:
+            last = page[-1]
+            self.next_cursor = encode_cursor(*[last[k] if isinstance(last, dict) else getattr(last, k) for k in self.keys])
+        return page
+
+    def _after(self, model, values):
+        """Row-value comparison (k1, k2, ...) > (v1, v2, ...) spelled out as ORs."""
+        if len(values) != len(self.keys):
+            raise NotFound("Invalid cursor.")
+        try:
+            values = [model._meta.get_field(k).to_python(v) for k, v in zip(self.keys, values)]
+        except (ValidationError, TypeError, ValueError, OverflowError):   # e.g. 1e400 for an id
+            raise NotFound("Invalid cursor.")
+        op = "lt" if self.descending else "gt"
+        cond = Q()
+        for i, key in enumerate(self.keys):
+            equal = {k: v for k, v in zip(self.keys[:i], values[:i])}
+            cond |= Q(**equal, **{f"{key}__{op}": values[i]})
+        return cond
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def next_headers(self):
+        if self.next_cursor is None:
+            return {}
+        return {"X-Next-Cursor": self.next_cursor, "Link": f'<{self.get_next_link()}>; rel="next"'}
+
+    def get_paginated_response(self, data):
+        return Response(data, headers=self.next_headers())
+    # Cursor pagination that keeps list-shaped responses for existing clients
+
+class MatchesPagination(KeysetPagination):
+    page_size = 50
+    keys = ("created_at", "id")   # newest first; id breaks created_at ties
+    descending = True
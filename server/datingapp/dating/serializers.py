@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
+from django.db import models
 from rest_framework import serializers
 from .models import Swipe, Match
+from accounts import fragments
 from accounts.serializers import PublicUserSerializer
 
 User = get_user_model()
@@ -8,14 +10,46 @@ User = get_user_model()
 class SwipeCreateSerializer(serializers.Serializer):
     target_id = serializers.IntegerField()
     action = serializers.ChoiceField(choices=["like","pass"])
+    next = serializers.BooleanField(required=False, default=True)  # false: client still has cards
+
+MAX_BATCH_SWIPES = 50
+
+class SwipeBatchSerializer(serializers.Serializer):
+    swipes = SwipeCreateSerializer(many=True, allow_empty=False, max_length=MAX_BATCH_SWIPES)
+
+class MatchListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        matches = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        others = [self.child.other(match) for match in matches]
+        render = self.child.user_serializer().to_representation
+        profiles = fragments.render_many(others, lambda missing: [render(user) for user in missing])
+        self.child._profiles = {user.pk: profile for user, profile in zip(others, profiles)}
+        return super().to_representation(matches)
+    # the other users' profiles for a whole page in one cache multi-get
 
 class MatchSerializer(serializers.ModelSerializer):
-    user1 = PublicUserSerializer(read_only=True)
-    user2 = PublicUserSerializer(read_only=True)
-    
+    """A match as seen by the requesting user: only the *other* person is included."""
+    user = serializers.SerializerMethodField()
+
     class Meta:
         model = Match
-        fields = ["id", "user1", "user2", "created_at"]
+        fields = ["id", "user", "created_at"]
+        list_serializer_class = MatchListSerializer
+
+    def other(self, obj):
+        return obj.user2 if obj.user1_id == self.context["request"].user.id else obj.user1
+
+    def user_serializer(self):
+        if not hasattr(self, "_user_serializer"):
+            self._user_serializer = PublicUserSerializer(context=self.context)   # one instance per page
+        return self._user_serializer
+
+    def get_user(self, obj):
+        other = self.other(obj)
+        profiles = getattr(self, "_profiles", {})
+        if other.pk in profiles:
+            return profiles[other.pk]
+        return self.user_serializer().to_representation(other)
 
 class FeedUserSerializer(PublicUserSerializer):
     pass
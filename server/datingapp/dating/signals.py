@@ -0,0 +1,13 @@
+# dating/signals.py
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from . import candidates
+
+User = get_user_model()
+
+# the deleted user's own queue; other users' queues drop this id lazily when the page is served
+@receiver(post_delete, sender=User)
+def drop_queue_of_deleted_user(sender, instance, **kwargs):
+    candidates.invalidate(instance.pk)
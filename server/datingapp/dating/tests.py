@@ -1,3 +1,624 @@
-from django.test import TestCase
+import base64
+from datetime import date
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
+from concurrent.futures import ThreadPoolExecutor
+import threading, time
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections
+from django.urls import include, path, reverse
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.test import APIClient, APITestCase
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from accounts import fragments
+from accounts.authentication import tokens_for
+from accounts.serializers import PROFILE_COLUMNS, PublicUserSerializer, public_profiles
+from datingapp import db_profiles, metrics, routers
+from datingapp.renderers import FastJSONRenderer, fast_renderer_classes
+from . import async_views, candidates
+from .models import Swipe, Match
+from .pagination import encode_cursor
+from .urls import dating_urls
+
+User = get_user_model()
+
+def make_user(username, gender, **extra):
+    extra.setdefault("birth_date", date(1995, 1, 1))
+    return User.objects.create(
+        username=username, gender=gender, bio="hi",
+        cover_image_url="https://example.com/c.jpg", **extra,
+    )
+
+class FeedCursorTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.me = make_user("me", "male")
+        self.women = [make_user(f"w{i}", "female") for i in range(25)]
+        make_user("m1", "male")
+        self.client.force_authenticate(self.me)
+
+    def test_pages_follow_cursor_and_skip_swiped(self):
+        Swipe.objects.create(user=self.me, target=self.women[0], is_like=False)
+        first = self.client.get(reverse("feed"))
+        self.assertEqual(first.status_code, 200)
+        ids = [u["id"] for u in first.data]
+        self.assertEqual(ids, [u.id for u in self.women[1:21]])
+        cursor = first["X-Next-Cursor"]
+
+        second = self.client.get(reverse("feed"), {"cursor": cursor})
+        self.assertEqual([u["id"] for u in second.data], [u.id for u in self.women[21:]])
+        self.assertFalse(second.has_header("X-Next-Cursor"))
+
+    def test_invalid_cursor_is_404(self):
+        res = self.client.get(reverse("feed"), {"cursor": "!!not-a-cursor"})
+        self.assertEqual(res.status_code, 404)
+        for raw in ("null", "1e400"):
+            token = base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+            self.assertEqual(self.client.get(reverse("feed"), {"cursor": token}).status_code, 404, raw)
+
+    def test_page_query_count_is_flat(self):
+        for w in self.women[:20]:
+            Swipe.objects.create(user=self.me, target=w, is_like=False)
+        with self.assertNumQueries(1):
+            res = self.client.get(reverse("feed"), {"cursor": encode_cursor(self.women[19].id)})
+        self.assertEqual(len(res.data), 5)
+
+@override_settings(
+    DATING_RECOMMENDER="dating.recommend.IdOrderRecommender",
+    DATING_CANDIDATE_QUEUE={"ALLOW_LOCAL": True},   # tests run on LocMemCache
+)
+class CandidateQueueTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.me = make_user("me", "male")
+        self.women = [make_user(f"w{i}", "female") for i in range(5)]
+        self.client.force_authenticate(self.me)
+        call_command("refill_candidate_queues", "--all", stdout=StringIO())
+
+    def test_feed_served_from_queue(self):
+        candidates.store_queues({self.me.id: [self.women[3].id, self.women[1].id]})
+        res = self.client.get(reverse("feed"))
+        self.assertEqual([u["id"] for u in res.data], [self.women[3].id, self.women[1].id])
+
+    def test_swipe_drains_queue_and_next_is_queue_head(self):
+        res = self.client.post(reverse("swipe"), {"target_id": self.women[0].id, "action": "pass"})
+        self.assertEqual(res.data["next"]["id"], self.women[1].id)
+        self.assertEqual(cache.get(candidates._key(self.me.id))[0], self.women[1].id)
+
+    def test_deleted_candidate_dropped_and_gender_change_invalidates(self):
+        self.women[0].delete()
+        res = self.client.get(reverse("feed"))
+        self.assertNotIn(self.women[0].id, [u["id"] for u in res.data])
+
+        self.client.patch(reverse("me"), {"bio": "new bio"}, format="json")
+        self.assertIsNotNone(cache.get(candidates._key(self.me.id)))
+        self.client.patch(reverse("me"), {"gender": "female"}, format="json")
+        self.assertIsNone(cache.get(candidates._key(self.me.id)))
+
+    @override_settings(DATING_RECOMMENDER="dating.recommend.VectorizedRecommender")
+    def test_refill_loads_no_deferred_fields(self):
+        self.me.likes, self.me.min_age_pref = ["gym"], 20
+        self.me.save()
+        with mock.patch.object(User, "refresh_from_db", side_effect=AssertionError("deferred field loaded")):
+            call_command("refill_candidate_queues", "--all", stdout=StringIO())
+        self.assertEqual(len(cache.get(candidates._key(self.me.id))), 5)
+
+    @override_settings(DATING_CANDIDATE_QUEUE={})
+    def test_queue_is_off_on_a_process_local_cache(self):
+        self.assertFalse(candidates.enabled())
+        self.assertIsNone(candidates.peek(self.me, 20))   # the queue filled in setUp is ignored
+        with self.assertRaises(CommandError):
+            call_command("refill_candidate_queues", "--all", stdout=StringIO())
+
+class SwipeQueryCountTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.me = make_user("me", "male")
+        self.her = make_user("her", "female")
+        self.other = make_user("other", "female")
+        self.client.force_authenticate(self.me)
+
+    def test_swipe_without_next_is_two_queries(self):
+        with self.assertNumQueries(2):
+            res = self.client.post(reverse("swipe"), {"target_id": self.her.id, "action": "pass", "next": False})
+        self.assertEqual(res.data, {"matched": False, "match_id": None, "next": None})
+        # a like also runs the conditional match INSERT ... RETURNING
+        with self.assertNumQueries(3):
+            self.client.post(reverse("swipe"), {"target_id": self.her.id, "action": "like", "next": False})
+        self.assertTrue(Swipe.objects.get(user=self.me, target=self.her).is_like)
+
+    def test_swipe_with_next_adds_one_query(self):
+        with self.assertNumQueries(3):
+            res = self.client.post(reverse("swipe"), {"target_id": self.her.id, "action": "pass"})
+        self.assertEqual(res.data["next"]["id"], self.other.id)
+
+    def test_mutual_like_creates_match_once(self):
+        Swipe.objects.create(user=self.her, target=self.me, is_like=True)
+        res = self.client.post(reverse("swipe"), {"target_id": self.her.id, "action": "like", "next": False})
+        self.assertTrue(res.data["matched"])
+        again = self.client.post(reverse("swipe"), {"target_id": self.her.id, "action": "like", "next": False})
+        self.assertEqual(again.data["match_id"], res.data["match_id"])
+        self.assertEqual(Match.objects.count(), 1)
+
+    def test_unknown_target_is_404(self):
+        res = self.client.post(reverse("swipe"), {"target_id": 99999, "action": "like"})
+        self.assertEqual(res.status_code, 404)
+
+class SwipeBatchTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.me = make_user("me", "male")
+        self.women = [make_user(f"w{i}", "female") for i in range(20)]
+        for w in self.women[:3]:
+            Swipe.objects.create(user=w, target=self.me, is_like=True)
+        self.client.force_authenticate(self.me)
+
+    def test_batch_records_swipes_and_matches_in_constant_queries(self):
+        items = [{"target_id": w.id, "action": "like"} for w in self.women]
+        items += [{"target_id": 99999, "action": "pass"}, {"target_id": self.me.id, "action": "like"}]
+        # lookup, swipe upsert, match INSERT ... RETURNING
+        with self.assertNumQueries(3):
+            res = self.client.post(reverse("swipe-batch"), {"swipes": items}, format="json")
+        self.assertEqual(res.status_code, 200)
+        results = res.data["results"]
+        self.assertEqual([r["status"] for r in results], [200] * 20 + [404, 400])
+        self.assertEqual(sum(r["matched"] for r in results[:20]), 3)
+        self.assertEqual(Swipe.objects.filter(user=self.me).count(), 20)
+        self.assertEqual(Match.objects.count(), 3)
+        self.assertEqual(
+            {r["match_id"] for r in results[:3]},
+            set(Match.objects.values_list("id", flat=True)),
+        )
+
+    def test_batch_size_is_capped(self):
+        items = [{"target_id": self.women[0].id, "action": "pass"}] * 51
+        res = self.client.post(reverse("swipe-batch"), {"swipes": items}, format="json")
+        self.assertEqual(res.status_code, 400)
+
+class ConcurrentMatchTests(TransactionTestCase):
+    """Many pairs liking each other at the same moment from separate threads."""
+
+    def test_concurrent_mutual_likes_create_one_match_per_pair(self):
+        men = [make_user(f"m{i}", "male") for i in range(20)]
+        women = [make_user(f"w{i}", "female") for i in range(20)]
+        jobs = [(m.id, w.id) for m, w in zip(men, women)] + [(w.id, m.id) for m, w in zip(men, women)]
+        start = threading.Barrier(8)
+
+        def swipe(pair):
+            try:
+                return Swipe.record(pair[0], pair[1], True)
+            finally:
+                connection.close()
+
+        def run(chunk):
+            start.wait()
+            return [swipe(p) for p in chunk]
+
+        chunks = [jobs[i::8] for i in range(8)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = [r for rs in pool.map(run, chunks) for r in rs]
+
+        created = [mid for mid in results if mid is not None]
+        self.assertEqual(len(created), 20)
+        self.assertEqual(len(set(created)), 20)
+        self.assertEqual(Match.objects.count(), 20)
+        self.assertEqual(Swipe.objects.count(), 40)
+
+class MatchesListTests(APITestCase):
+    def setUp(self):
+        self.me = make_user("me", "male")
+        self.women = [make_user(f"w{i}", "female") for i in range(60)]
+        for i, w in enumerate(self.women):
+            # alternate sides so both user1=me and user2=me rows exist
+            a, b = (self.me, w) if i % 2 else (w, self.me)
+            Match.objects.create(user1=a, user2=b)
+        self.client.force_authenticate(self.me)
+
+    def test_one_query_per_page_and_only_other_user(self):
+        with self.assertNumQueries(1):
+            first = self.client.get(reverse("matches"))
+        self.assertEqual(len(first.data), 50)
+        self.assertEqual(set(first.data[0]), {"id", "user", "created_at"})
+        self.assertNotIn(self.me.id, [m["user"]["id"] for m in first.data])
+        self.assertIn("age", first.data[0]["user"])
+
+        with self.assertNumQueries(1):
+            second = self.client.get(reverse("matches"), {"cursor": first["X-Next-Cursor"]})
+        ids = [m["id"] for m in first.data + second.data]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(set(ids)), 60)
+
+    def test_malformed_cursor_is_404(self):
+        for values in ([123, 1], [{"x": 1}, 1], [None, 1], ["not-a-date", 1], ["2025-01-01T00:00:00Z"]):
+            res = self.client.get(reverse("matches"), {"cursor": encode_cursor(*values)})
+            self.assertEqual(res.status_code, 404, values)
+
+class ProfileFragmentTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.me = make_user("me", "male")
+        self.women = [make_user(f"w{i}", "female") for i in range(3)]
+        Match.objects.create(user1=self.women[0], user2=self.me)
+        self.client.force_authenticate(self.me)
+
+    def test_pages_reuse_fragments_until_profile_changes(self):
+        feed, matches = self.client.get(reverse("feed")).data, self.client.get(reverse("matches")).data
+        with mock.patch.object(PublicUserSerializer, "to_representation") as render:
+            self.assertEqual(self.client.get(reverse("feed")).data, feed)
+            self.assertEqual(self.client.get(reverse("matches")).data, matches)
+        render.assert_not_called()
+
+        self.women[0].bio = "new bio"
+        self.women[0].save()
+        self.assertEqual(self.client.get(reverse("feed")).data[0]["bio"], "new bio")
+        self.assertEqual(self.client.get(reverse("matches")).data[0]["user"]["bio"], "new bio")
+
+        # the media worker sets the cover with QuerySet.update()
+        User.objects.filter(pk=self.women[1].pk).update(cover_image_url="https://example.com/feed.webp")
+        self.assertEqual(self.client.get(reverse("feed")).data[1]["cover_image_url"], "https://example.com/c.jpg")
+        fragments.invalidate(self.women[1].pk)
+        self.assertEqual(self.client.get(reverse("feed")).data[1]["cover_image_url"], "https://example.com/feed.webp")
+
+class FastFeedTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.me = make_user("me", "male")
+        self.women = [
+            make_user("w0", "female", first_name="Zoë", likes=["gym", "food"]),
+            make_user("w1", "female", last_name="line\u2028break \u2603"),
+            make_user("w2", "female", birth_date=None),
+        ]
+        self.client.force_authenticate(self.me)
+
+    def expected(self):
+        data = PublicUserSerializer(User.objects.filter(gender="female").order_by("id"), many=True).data
+        return JSONRenderer().render(data)
+
+    @override_settings(DATING_CANDIDATE_QUEUE={"ALLOW_LOCAL": True})
+    def test_same_bytes_as_serializer(self):
+        expected = self.expected()
+        self.assertEqual(self.client.get(reverse("feed")).content, expected)
+        candidates.store_queues({self.me.id: [w.id for w in self.women]})
+        self.assertEqual(self.client.get(reverse("feed")).content, expected)   # queue path
+        cache.clear()
+        self.assertEqual(FastJSONRenderer().render(public_profiles(
+            User.objects.filter(gender="female").order_by("id").values(*PROFILE_COLUMNS)
+        )), expected)
+
+    def test_fast_renderer_replaces_json_renderer_wherever_it_is(self):
+        self.assertEqual(
+            fast_renderer_classes([BrowsableAPIRenderer, JSONRenderer]), [FastJSONRenderer, BrowsableAPIRenderer]
+        )
+        self.assertEqual(fast_renderer_classes([FastJSONRenderer]), [FastJSONRenderer])
+
+@override_settings(CONDITIONAL_GET={"ALLOW_LOCAL": True})   # tests run on LocMemCache
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.me = make_user("me", "male")
+        self.women = [make_user(f"w{i}", "female") for i in range(3)]
+        self.client.force_authenticate(self.me)
+
+    def revalidate(self, name, etag):
+        with self.assertNumQueries(0):
+            return self.client.get(reverse(name), HTTP_IF_NONE_MATCH=etag)
+
+    def test_304_until_the_users_counters_move(self):
+        feed, matches, me = (self.client.get(reverse(name)) for name in ("feed", "matches", "me"))
+        for name, res in (("feed", feed), ("matches", matches), ("me", me)):
+            self.assertTrue(res["ETag"].startswith('W/"'))
+            self.assertIn("private", res["Cache-Control"])
+            not_modified = self.revalidate(name, res["ETag"])
+            self.assertEqual(not_modified.status_code, 304)
+            self.assertEqual(not_modified["ETag"], res["ETag"])
+
+        Swipe.objects.create(user=self.women[0], target=self.me, is_like=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("swipe"), {"target_id": self.women[0].id, "action": "like"}, format="json")
+        self.assertEqual(self.client.get(reverse("feed"), HTTP_IF_NONE_MATCH=feed["ETag"]).status_code, 200)
+        self.assertEqual(self.client.get(reverse("matches"), HTTP_IF_NONE_MATCH=matches["ETag"]).status_code, 200)
+        self.assertEqual(self.revalidate("me", me["ETag"]).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse("me"), {"bio": "changed"}, format="json")
+        self.assertEqual(self.client.get(reverse("me"), HTTP_IF_NONE_MATCH=me["ETag"]).status_code, 200)
+
+    @override_settings(CONDITIONAL_GET={})
+    def test_off_on_a_process_local_cache(self):
+        first = self.client.get(reverse("me"))
+        self.assertNotIn("ETag", first)
+        self.assertNotIn("Last-Modified", first)
+        res = self.client.get(reverse("me"), HTTP_IF_NONE_MATCH="*", HTTP_IF_MODIFIED_SINCE="Fri, 01 Jan 2100 00:00:00 GMT")
+        self.assertEqual(res.status_code, 200)
+
+    def test_etag_depends_on_query_and_window(self):
+        first = self.client.get(reverse("feed"))
+        self.assertNotEqual(self.client.get(reverse("feed"), {"rank": "interests"})["ETag"], first["ETag"])
+        with mock.patch("datingapp.conditional.time.time", return_value=time.time() + 60):
+            self.assertEqual(self.client.get(reverse("feed"), HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 200)
+
+    def test_if_modified_since_never_hides_a_change_in_the_same_second(self):
+        start = int(time.time()) + 0.1
+        clock = mock.Mock(time=lambda: now, time_ns=lambda: int(now * 1e9))
+
+        def get(**headers):
+            with mock.patch("datingapp.conditional.time", clock):
+                return self.client.get(reverse("me"), **headers)
+
+        now = start
+        self.assertNotIn("Last-Modified", get())   # counter is under a second old
+        now = start + 1.5
+        stamped = get()["Last-Modified"]
+        self.assertEqual(get(HTTP_IF_MODIFIED_SINCE=stamped).status_code, 304)
+        now = start + 1.6
+        with mock.patch("datingapp.conditional.time", clock), self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse("me"), {"bio": "changed"}, format="json")
+        now = start + 1.7   # same second as the stamp: no Last-Modified, If-Modified-Since ignored
+        self.assertEqual(get(HTTP_IF_MODIFIED_SINCE=stamped).status_code, 200)
+        now = start + 3
+        self.assertEqual(get(HTTP_IF_MODIFIED_SINCE=stamped).status_code, 200)
+
+class FeedAgeRangeTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        today = date.today()
+        self.me = make_user("me", "male", min_age_pref=25, max_age_pref=30)
+        self.young = make_user("young", "female", birth_date=date(today.year - 22, 1, 1))
+        self.match = make_user("match", "female", birth_date=date(today.year - 28, 1, 1))
+        self.old = make_user("old", "female", birth_date=date(today.year - 40, 1, 1))
+        self.client.force_authenticate(self.me)
+
+    def test_feed_filters_by_age_range_in_sql(self):
+        res = self.client.get(reverse("feed"))
+        self.assertEqual([u["id"] for u in res.data], [self.match.id])
+        self.assertIn('"birth_date" <=', str(candidates.unswiped_qs(self.me).query))
+
+    def test_me_rejects_inverted_range(self):
+        res = self.client.patch(reverse("me"), {"min_age_pref": 40, "max_age_pref": 30}, format="json")
+        self.assertEqual(res.status_code, 400)
+
+class InterestRankingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.me = make_user("me", "male", likes=["food", "gym", "songs"])
+        self.none = make_user("none", "female", likes=["chess"])
+        self.one = make_user("one", "female", likes=["food"])
+        self.two = make_user("two", "female", likes=["gym", "songs", "art"])
+        self.client.force_authenticate(self.me)
+
+    def test_feed_ranked_by_shared_likes(self):
+        with self.assertNumQueries(2):
+            res = self.client.get(reverse("feed"), {"rank": "interests"})
+        self.assertEqual([u["id"] for u in res.data], [self.two.id, self.one.id, self.none.id])
+
+class RecommenderTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.me = make_user("me", "male", likes=["food", "gym"])
+        self.plain = make_user("plain", "female", likes=["chess"])
+        self.shares = make_user("shares", "female", likes=["food", "gym"])
+        self.fan = make_user("fan", "female")
+        Swipe.objects.create(user=self.fan, target=self.me, is_like=True)
+        self.client.force_authenticate(self.me)
+
+    def test_recommended_feed_orders_by_score(self):
+        with self.assertNumQueries(3):
+            res = self.client.get(reverse("feed"), {"rank": "recommended"})
+        self.assertEqual([u["id"] for u in res.data], [self.fan.id, self.shares.id, self.plain.id])
+
+    def test_candidates_past_the_first_block_are_scored(self):
+        from .recommend import VectorizedRecommender
+        filler = [make_user(f"f{i}", "female", likes=["chess"]) for i in range(4)]
+        best = make_user("best", "female", likes=["food", "gym"])
+        Swipe.objects.create(user=best, target=self.me, is_like=True)
+        engine = VectorizedRecommender()
+        engine.block_size = 2
+        ranked = engine.top_k(self.me, candidates.unswiped_qs(self.me), 3)
+        self.assertEqual([u.id for u in ranked], [best.id, self.fan.id, self.shares.id])
+        self.assertNotIn(filler[0].id, [u.id for u in ranked])
+
+    def test_engine_without_top_k_is_refused(self):
+        from .recommend import Recommender
+        class Incomplete(Recommender):
+            pass
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+    def test_top_k_indices_matches_full_sort(self):
+        import numpy as np
+        from .recommend import top_k_indices
+        scores = np.random.default_rng(0).random(1000)
+        self.assertEqual(top_k_indices(scores, 10).tolist(), np.argsort(-scores)[:10].tolist())
+
+class MetricsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.me = make_user("me", "male")
+        make_user("her", "female")
+        self.client.force_authenticate(self.me)
+
+    def test_feed_request_is_recorded(self):
+        before = metrics.DB_QUERIES.snapshot("feed")
+        self.client.get(reverse("feed"))
+        after = metrics.DB_QUERIES.snapshot("feed")
+        self.assertEqual(sum(after[:-1]) - sum(before[:-1] or [0]), 1)
+
+    def test_endpoint_is_staff_only(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        self.me.is_staff = True
+        self.client.get(reverse("feed"))
+        res = self.client.get(reverse("metrics"))
+        self.assertEqual(res.status_code, 200)
+        self.assertIn('dating_db_queries_count{view="feed"}', res.content.decode())
+
+    @override_settings(QUERY_BUDGETS={"feed": 0}, QUERY_BUDGET_STRICT=True)
+    def test_strict_budget_fails_loudly(self):
+        with self.assertRaises(metrics.QueryBudgetExceeded):
+            self.client.get(reverse("feed"))
+
+class DatabaseProfileTests(SimpleTestCase):
+    base = Path("/srv/app")
+
+    def config(self, **env):
+        return db_profiles.database_config(self.base, env)
+
+    def test_sqlite_profiles(self):
+        plain = self.config()
+        self.assertEqual(plain["ENGINE"], "django.db.backends.sqlite3")
+        self.assertEqual(plain["NAME"], self.base / "db.sqlite3")
+        self.assertNotIn("OPTIONS", plain)
+        wal = self.config(DB_PROFILE="sqlite-wal", SQLITE_PATH="/data/app.db", CONN_MAX_AGE="30")
+        self.assertEqual(wal["NAME"], "/data/app.db")
+        self.assertIn("journal_mode=WAL", wal["OPTIONS"]["init_command"])
+        self.assertEqual(wal["OPTIONS"]["transaction_mode"], "IMMEDIATE")
+        self.assertEqual((wal["CONN_MAX_AGE"], wal["CONN_HEALTH_CHECKS"]), (30, True))
+
+    @mock.patch("datingapp.db_profiles.find_spec", return_value=object())
+    def test_postgres_pool_and_persistent_connections(self, find_spec):
+        pooled = self.config(DB_PROFILE="postgres", POSTGRES_HOST="db", POSTGRES_POOL_MAX="50")
+        self.assertEqual(pooled["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual((pooled["HOST"], pooled["PORT"], pooled["CONN_MAX_AGE"]), ("db", "5432", 0))
+        self.assertEqual(pooled["OPTIONS"]["pool"], {"min_size": 2, "max_size": 50, "timeout": 10, "max_idle": 300})
+        persistent = self.config(DB_PROFILE="postgres", POSTGRES_POOL="0", CONN_MAX_AGE="120")
+        self.assertNotIn("pool", persistent["OPTIONS"])
+        self.assertEqual((persistent["CONN_MAX_AGE"], persistent["CONN_HEALTH_CHECKS"]), (120, True))
+
+    def test_bad_env_is_refused(self):
+        with self.assertRaises(ValueError):
+            self.config(DB_PROFILE="mysql")
+        with self.assertRaises(ValueError):
+            self.config(DB_PROFILE="sqlite-wal", CONN_MAX_AGE="ten")
+        with mock.patch("datingapp.db_profiles.find_spec", return_value=None):
+            with self.assertRaisesMessage(ImproperlyConfigured, "psycopg"):
+                self.config(DB_PROFILE="postgres")
+
+    @mock.patch("datingapp.db_profiles.find_spec", return_value=object())
+    def test_replica_config(self, find_spec):
+        self.assertIsNone(db_profiles.replica_config(self.base, {}))
+        sqlite = db_profiles.replica_config(self.base, {"SQLITE_REPLICA_PATH": "/data/replica.db"})
+        self.assertEqual(sqlite["NAME"], "/data/replica.db")
+        self.assertIsNone(db_profiles.replica_config(self.base, {"DB_PROFILE": "postgres"}))
+        pg = db_profiles.replica_config(self.base, {"DB_PROFILE": "postgres", "POSTGRES_REPLICA_HOST": "replica"})
+        self.assertEqual((pg["HOST"], pg["PORT"], pg["TEST"]), ("replica", "5432", {"MIRROR": "default"}))
+
+class ReplicaRoutingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.me = make_user("me", "male")
+        self.her = make_user("her", "female")
+        self.client.force_authenticate(self.me)
+
+    def test_router_reads_replica_only_when_switched_on(self):
+        router = routers.ReplicaRouter()
+        with mock.patch("datingapp.routers.replica_configured", return_value=True):
+            self.assertIsNone(router.db_for_read(Swipe))
+            with routers.replica_reads():
+                self.assertEqual(router.db_for_read(Swipe), "replica")
+                self.assertEqual(router.db_for_write(Swipe), "default")
+        with routers.replica_reads():
+            self.assertIsNone(router.db_for_read(Swipe))   # no replica alias
+
+    def test_swipe_pins_user_to_primary(self):
+        with mock.patch("datingapp.routers.replica_configured", return_value=True):
+            self.assertFalse(routers.is_pinned(self.me.id))
+            self.client.post(reverse("swipe"), {"target_id": self.her.id, "action": "pass"}, format="json")
+            self.assertTrue(routers.is_pinned(self.me.id))
+            self.assertFalse(routers.is_pinned(self.her.id))
+
+@skipUnless(routers.replica_configured(), "needs SQLITE_REPLICA_PATH (or POSTGRES_REPLICA_HOST)")
+class ReplicaReadTests(TransactionTestCase):
+    databases = "__all__"   # default + replica
+
+    def setUp(self):
+        cache.clear()
+        self.me = make_user("me", "male")
+        self.her = make_user("her", "female")
+        for user in (self.me, self.her):
+            user.save(using="replica")
+        make_user("fresh", "female")   # not replicated yet
+        self.client = APIClient()
+        self.client.force_authenticate(self.me)
+
+    def test_feed_reads_replica_until_user_swipes(self):
+        if connections["replica"].settings_dict["TEST"].get("MIRROR"):
+            self.skipTest("replica mirrors the test primary")
+        names = lambda res: {u["username"] for u in res.data}
+        self.assertEqual(names(self.client.get(reverse("feed"))), {"her"})
+        self.client.post(reverse("swipe"), {"target_id": self.her.id, "action": "pass"}, format="json")
+        # pinned: the primary has the swipe and the unreplicated user
+        self.assertEqual(names(self.client.get(reverse("feed"))), {"fresh"})
+
+# dating URLs served by the async views, for AsyncViewTests
+urlpatterns = [path("api/dating/", include(dating_urls(async_views)))]
+
+# authenticate from the token claims and answer conditional GETs, as on a shared cache
+@override_settings(CLAIMS_AUTH={"ALLOW_LOCAL": True}, CONDITIONAL_GET={"ALLOW_LOCAL": True})
+class AsyncViewTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.me = make_user("me", "male")
+        self.women = [make_user(f"w{i}", "female") for i in range(25)]
+        for w in self.women[:3]:
+            Match.create_sorted(self.me, w)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens_for(self.me).access_token}")
+
+    def both(self, method, path, data=None):
+        """(sync response, async response) for the same request."""
+        sync = getattr(self.client, method)(path, data, format="json")
+        with override_settings(ROOT_URLCONF="dating.tests"):
+            return sync, getattr(self.client, method)(path, data, format="json")
+
+    def test_feed_and_matches_match_the_drf_views(self):
+        sync, async_ = self.both("get", "/api/dating/feed/")
+        self.assertEqual(async_.status_code, 200)
+        self.assertEqual(async_.content, sync.content)
+        self.assertEqual(async_["X-Next-Cursor"], sync["X-Next-Cursor"])
+        sync, async_ = self.both("get", "/api/dating/feed/", {"cursor": sync["X-Next-Cursor"]})
+        self.assertEqual(len(async_.json()), 5)
+        self.assertEqual(async_.content, sync.content)
+        sync, async_ = self.both("get", "/api/dating/matches/")
+        self.assertEqual(len(async_.json()), 3)
+        self.assertEqual(async_.content, sync.content)
+        self.assertEqual(async_["ETag"], sync["ETag"])
+        with override_settings(ROOT_URLCONF="dating.tests"):
+            self.assertEqual(self.client.get("/api/dating/matches/", HTTP_IF_NONE_MATCH=sync["ETag"]).status_code, 304)
+
+    def test_swipe(self):
+        Swipe.objects.create(user=self.women[5], target=self.me, is_like=True)
+        with override_settings(ROOT_URLCONF="dating.tests"):
+            res = self.client.post("/api/dating/swipe/", {"target_id": self.women[5].id, "action": "like"}, format="json")
+            self.assertIs(res.resolver_match.func.view_class, async_views.SwipeView)
+            self.assertEqual(res.status_code, 200)
+            body = res.json()
+            self.assertTrue(body["matched"])
+            self.assertEqual(body["next"]["id"], self.women[0].id)
+            self.assertEqual(body["match_id"], Match.objects.get(user1=self.me, user2=self.women[5]).id)
+            res = self.client.post("/api/dating/swipe/", {"target_id": 99999, "action": "like"}, format="json")
+            self.assertEqual(res.status_code, 404)
+            res = self.client.post("/api/dating/swipe/", {"target_id": self.women[6].id, "action": "maybe"}, format="json")
+            self.assertEqual(res.status_code, 400)
+            self.assertIn("action", res.json())
+
+    def test_bad_or_missing_token_is_401(self):
+        with override_settings(ROOT_URLCONF="dating.tests"):
+            self.client.credentials()
+            self.assertEqual(self.client.get("/api/dating/feed/").status_code, 401)
+            self.client.credentials(HTTP_AUTHORIZATION="Bearer nope")
+            res = self.client.get("/api/dating/feed/")
+            self.assertEqual(res.status_code, 401)
+            self.assertEqual(res.json()["code"], "token_not_valid")
+
+    def test_metrics_count_async_queries(self):
+        with override_settings(ROOT_URLCONF="dating.tests"):
+            before = metrics.DB_QUERIES.snapshot("feed")
+            self.client.get("/api/dating/feed/")
+            after = metrics.DB_QUERIES.snapshot("feed")
+        self.assertEqual(sum(after[:-1]) - sum(before[:-1] or [0]), 1)
+        self.assertEqual(after[-1] - (before[-1] if before else 0), 1)   # the feed page; the user comes from the token
@@ -1,9 +1,16 @@
 # dating/urls.py
+from django.conf import settings
 from django.urls import path
-from .views import FeedView, SwipeView, MatchesListView
+from . import async_views, views
 
-urlpatterns = [
-    path("feed/", FeedView.as_view(), name="feed"),    # swipe feed (paginated small batch)
-    path("swipe/", SwipeView.as_view(), name="swipe"),  # submit a swipe action (like/pass)
-    path("matches/", MatchesListView.as_view(), name="matches"),  # list of user's matches
-]
+def dating_urls(flavour):
+    """Feed / swipe / matches from `flavour` (views or async_views); batch swipes stay sync."""
+    return [
+        path("feed/", flavour.FeedView.as_view(), name="feed"),    # swipe feed (paginated small batch)
+        path("swipe/", flavour.SwipeView.as_view(), name="swipe"),  # submit a swipe action (like/pass)
+        path("swipes/batch/", views.SwipeBatchView.as_view(), name="swipe-batch"),  # many swipes in one request
+        path("matches/", flavour.MatchesListView.as_view(), name="matches"),  # list of user's matches
+    ]
+
+# DATING_ASYNC_VIEWS: serve ASGI-native views (run under an ASGI server)
+urlpatterns = dating_urls(async_views if settings.DATING_ASYNC_VIEWS else views)
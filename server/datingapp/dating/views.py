@@ -1,91 +1,190 @@
 # dating/views.py
-from django.db.models import Q
+from django.db.models import Q, Exists, OuterRef, Subquery
 from django.contrib.auth import get_user_model
 from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 
 from .models import Swipe, Match
-from .serializers import SwipeCreateSerializer, MatchSerializer, FeedUserSerializer
+from .serializers import SwipeCreateSerializer, SwipeBatchSerializer, MatchSerializer, FeedUserSerializer
+from accounts.serializers import PROFILE_COLUMNS, PublicUserSerializer, public_profiles
+from datingapp.conditional import conditional
+from datingapp.renderers import fast_renderer_classes
+from datingapp.routers import ReplicaReadMixin, pin_to_primary
+from .pagination import KeysetPagination, MatchesPagination
+from . import candidates
+from .recommend import get_recommender
 
 User = get_user_model()
 
-def _opposite_gender_qs(me):
+class FeedView(ReplicaReadMixin, generics.ListAPIView):
     """
-    Returns a base queryset of candidates filtered by opposite gender:
-      - male  -> gender='female'
-      - female-> gender='male'
-      - other/blank -> no gender filter (show everyone)
-    (You already require gender at signup; this just keeps workshops safe.)
+    Batch feed of 20 candidates. The first page is served from the user's
+    precomputed candidate queue, in recommender order, when one exists, and
+    otherwise ordered by id; cursor pages always come from the DB, by id.
+    Follow the X-Next-Cursor header (?cursor=...) for the next page, or simply
+    call again after you swipe through the batch.
+    ?rank=interests orders by shared like tokens, ?rank=recommended by the
+    configured recommendation engine (no cursor for either; call again after
+    swiping, swiped candidates drop out).
+    Reads from the read replica, if any, unless the user swiped moments ago.
+    Conditional GETs (ETag / Last-Modified, see datingapp/conditional.py) get a
+    304 without a query while the user's profile and swipes are unchanged.
+    Queue and cursor pages fetch just the profile columns (.values()) and skip
+    the serializer (accounts.serializers.public_profiles); same JSON, faster.
     """
-    desired = None
-    if getattr(me, "gender", None) == "male":
-        desired = "female"
-    elif getattr(me, "gender", None) == "female":
-        desired = "male"
-
-    qs = User.objects.exclude(id=me.id)
-    if desired:
-        qs = qs.filter(gender=desired)
-    return qs
-    # helper: return candidate users filtered by opposite gender preference
-
-class FeedView(generics.ListAPIView):
-    """Batch feed: call again after you swipe through 20."""
     serializer_class = FeedUserSerializer
+    pagination_class = KeysetPagination
+    renderer_classes = fast_renderer_classes()
     def get_queryset(self):
-        me = self.request.user
-        swiped_ids = Swipe.objects.filter(user=me).values_list("target_id", flat=True)
-        return (
-            _opposite_gender_qs(me)
-            .exclude(id__in=swiped_ids)
-            .order_by("id")[:20]
-        )
-    # Returns a short page of candidates for the swipe feed
+        return candidates.unswiped_qs(self.request.user)
+
+    @conditional("feed", "profile", "swipes")
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get("rank") == "interests":
+            ranked = candidates.interest_ranked(request.user, self.paginator.page_size)
+            return Response(self.get_serializer(ranked, many=True).data)
+        if request.query_params.get("rank") == "recommended":
+            ranked = get_recommender().top_k(request.user, self.get_queryset(), self.paginator.page_size)
+            return Response(self.get_serializer(ranked, many=True).data)
+        if self.paginator.cursor_query_param not in request.query_params:
+            queued = candidates.peek(request.user, self.paginator.page_size, fields=PROFILE_COLUMNS)
+            if queued:
+                return Response(public_profiles(queued))
+        page = self.paginate_queryset(self.get_queryset().values(*PROFILE_COLUMNS))
+        return self.get_paginated_response(public_profiles(page))
+    # Returns a short keyset-paginated page of candidates for the swipe feed
+
+def _annotate_swipe_targets(qs, me):
+    """Adds liked_me (reciprocal like exists) and match_id (existing match) per target."""
+    liked_me = Swipe.objects.filter(user=OuterRef("pk"), target=me, is_like=True)
+    existing_match = Match.objects.filter(
+        Q(user1=me, user2=OuterRef("pk")) | Q(user1=OuterRef("pk"), user2=me)
+    ).values("id")[:1]
+    return qs.annotate(liked_me=Exists(liked_me), match_id=Subquery(existing_match))
+    # helper: everything a swipe needs to know about its target(s) in one query
 
 class SwipeView(APIView):
-    """POST { target_id, action: 'like'|'pass' } → { matched: bool, match_id, next }"""
+    """
+    POST { target_id, action: 'like'|'pass', next?: bool } → { matched: bool, match_id, next }
+    Send next=false while the client still holds unswiped cards from its feed
+    window; the swipe then costs two queries (lookup + upsert).
+    """
     def post(self, request):
         ser = SwipeCreateSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
         target_id = ser.validated_data["target_id"]
-        action = ser.validated_data["action"]
+        is_like = ser.validated_data["action"] == "like"
+        me = request.user
 
-        if target_id == request.user.id:
+        if target_id == me.id:
             return Response({"detail":"Cannot swipe yourself."}, status=400)
 
-        try:
-            target = User.objects.get(id=target_id)
-        except User.DoesNotExist:
+        # target existence, reciprocal like and any existing match in one round trip
+        target = (
+            _annotate_swipe_targets(User.objects.filter(id=target_id), me)
+            .values("liked_me", "match_id")
+            .first()
+        )
+        if target is None:
             return Response({"detail":"Target not found."}, status=404)
 
-        swipe, _ = Swipe.objects.update_or_create(
-            user=request.user, target=target,
-            defaults={"is_like": action == "like"},
-        )
+        # swipe upsert + mutual-match insert in one transaction (see Swipe.record_many)
+        new_match_id = Swipe.record(me.id, target_id, is_like)
 
         matched = False
         match_id = None
-        if swipe.is_like and Swipe.objects.filter(user=target, target=request.user, is_like=True).exists():
-            match = Match.create_sorted(request.user, target)
-            matched = True
-            match_id = match.id
-
-        # next suggestion uses same opposite-gender filter
-        next_user = (
-            _opposite_gender_qs(request.user)
-            .exclude(id__in=Swipe.objects.filter(user=request.user).values_list("target_id", flat=True))
-            .order_by("id")
-            .first()
-        )
-        next_payload = FeedUserSerializer(next_user).data if next_user else None
+        if new_match_id is not None:
+            matched, match_id = True, new_match_id
+        elif is_like and target["liked_me"] and target["match_id"]:
+            matched, match_id = True, target["match_id"]  # re-like of an existing match
+
+        candidates.drain(me.id, target_id)
+        pin_to_primary(me.id)   # read-your-writes on the next feed/matches call
+
+        next_payload = None
+        if ser.validated_data["next"]:
+            # next suggestion: head of the candidate queue, else same feed query
+            queued = candidates.peek(me, 1)
+            next_user = queued[0] if queued else candidates.unswiped_qs(me).order_by("id").first()
+            next_payload = FeedUserSerializer(next_user).data if next_user else None
 
         return Response({"matched": matched, "match_id": match_id, "next": next_payload}, status=status.HTTP_200_OK)
-    # Record a swipe, create a Match if mutual like, and return next suggestion
+    # Record a swipe, create a Match if mutual like, and optionally return next suggestion
 
-class MatchesListView(generics.ListAPIView):
+class SwipeBatchView(APIView):
+    """
+    POST { swipes: [{ target_id, action }, ...] } (max 50)
+      → { results: [{ target_id, status, matched, match_id } | { target_id, status, detail }] }
+    Results follow the request order; status mirrors what /swipe/ would have returned.
+    A repeated target_id counts once, with its last action.
+    Runs a constant number of statements regardless of batch size
+    (one lookup plus Swipe.record_many).
+    """
+    def post(self, request):
+        ser = SwipeBatchSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        me = request.user
+        actions = {}
+        for item in ser.validated_data["swipes"]:
+            actions[item["target_id"]] = item["action"] == "like"
+
+        targets = {
+            row["id"]: row
+            for row in _annotate_swipe_targets(User.objects.filter(id__in=actions), me)
+            .values("id", "liked_me", "match_id")
+        }
+        valid = {tid: like for tid, like in actions.items() if tid in targets and tid != me.id}
+
+        match_ids = {tid: targets[tid]["match_id"] for tid, like in valid.items()
+                     if like and targets[tid]["liked_me"] and targets[tid]["match_id"]}
+        match_ids.update(Swipe.record_many(me.id, valid))
+
+        candidates.drain_many(me.id, valid)
+        if valid:
+            pin_to_primary(me.id)
+
+        results = []
+        for item in ser.validated_data["swipes"]:
+            tid = item["target_id"]
+            if tid == me.id:
+                results.append({"target_id": tid, "status": 400, "detail": "Cannot swipe yourself."})
+            elif tid not in targets:
+                results.append({"target_id": tid, "status": 404, "detail": "Target not found."})
+            else:
+                mid = match_ids.get(tid)
+                results.append({"target_id": tid, "status": 200, "matched": mid is not None, "match_id": mid})
+        return Response({"results": results}, status=status.HTTP_200_OK)
+    # Record many swipes at once and resolve all resulting matches in bulk
+
+class MatchesListView(ReplicaReadMixin, generics.ListAPIView):
+    """
+    Newest matches first, 50 per page (follow X-Next-Cursor for more).
+    Each item carries only the other user; both users come from the same
+    JOINed query, limited to the public profile columns.
+    Reads from the read replica, if any, unless the user swiped moments ago.
+    Conditional GETs get a 304 without a query while the user has no new match.
+    """
     serializer_class = MatchSerializer
+    pagination_class = MatchesPagination
+    renderer_classes = fast_renderer_classes()
     def get_queryset(self):
-        me = self.request.user
-        return Match.objects.filter(Q(user1=me) | Q(user2=me)).order_by("-created_at")
-    # List all matches for the authenticated user
+        return matches_qs(self.request.user)
+
+    @conditional("matches", "matches")
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+    # List the authenticated user's matches in a fixed number of queries
+
+def matches_qs(me):
+    """`me`'s matches with both users JOINed in, limited to the public profile columns (and version)."""
+    public = [f for f in PublicUserSerializer.Meta.fields if f != "age"]
+    return (
+        Match.objects.filter(Q(user1=me) | Q(user2=me))
+        .select_related("user1", "user2")
+        .only("id", "created_at", "user1_id", "user2_id", "user1__profile_version", "user2__profile_version",
+              *[f"user1__{f}" for f in public], *[f"user2__{f}" for f in public])
+    )
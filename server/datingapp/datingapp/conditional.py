@@ -0,0 +1,145 @@
+# datingapp/conditional.py
+"""
+Conditional GETs (ETag / If-None-Match, Last-Modified / If-Modified-Since)
+from per-user version counters.
+
+A counter is a timestamp token in the cache, one per user and scope:
+- "profile": the user's own row (accounts.signals, the media worker)
+- "swipes":  swipes the user made (Swipe.record_many)
+- "matches": matches the user is part of (Swipe.record_many, for both users)
+bump() replaces it. A view decorated with @conditional(name, *scopes) hashes
+its scopes' tokens with the user id and request path into a weak ETag, and
+takes the newest token as Last-Modified. Checking a conditional request costs
+one cache get_many and no SQL: a 304 goes out before the view body, and its
+main query, runs. An evicted counter comes back as a fresh token, so eviction
+causes a spurious 200, never a stale 304. Last-Modified has HTTP's one-second
+resolution, so it is only sent (and If-Modified-Since only honoured) once the
+newest token is at least a second old: a later change then always lands in a
+later second. Clients should prefer If-None-Match, which Django checks in place
+of If-Modified-Since when both are sent.
+
+The counters must be shared by every worker: on a process-local LocMemCache a
+swipe bumps them only in the worker that handled it, and another worker would
+answer 304 with a stale body. There, conditional GETs are off (no ETag, no
+Last-Modified, full responses) unless ALLOW_LOCAL is set.
+
+Some inputs have no counter of their own: other users' profiles (matches,
+feed), new signups and queue refills (feed). For those views the ETag also
+carries a time window (WINDOWS, seconds), which bounds how long a polling
+client can keep a stale body.
+"""
+import asyncio, hashlib, time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .sharedcache import is_shared
+
+CONDITIONAL_DEFAULTS = {
+    "CACHE": "default",              # cache alias holding the counters
+    "TIMEOUT": 7 * 24 * 60 * 60,     # seconds a counter is kept
+    "WINDOWS": {"feed": 60, "matches": 300},
+    "ALLOW_LOCAL": False,            # use the counters even on a per-process LocMemCache
+}
+
+def conf():
+    return {**CONDITIONAL_DEFAULTS, **getattr(settings, "CONDITIONAL_GET", {})}
+
+def _cache():
+    return caches[conf()["CACHE"]]
+
+def enabled():
+    cfg = conf()
+    return cfg["ALLOW_LOCAL"] or is_shared(cfg["CACHE"])
+
+def _key(user_id, scope):
+    return f"cond:{scope}:{user_id}"
+
+def _token():
+    return time.time_ns() // 1000   # microseconds
+
+def bump(scope, *user_ids):
+    """New `scope` counters for `user_ids`, once the current transaction (if any) commits."""
+    if user_ids and enabled():
+        tokens = {_key(pk, scope): _token() for pk in user_ids}
+        transaction.on_commit(lambda: _cache().set_many(tokens, conf()["TIMEOUT"]))
+
+def versions(user_id, scopes):
+    cache, keys = _cache(), [_key(user_id, scope) for scope in scopes]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        for key in missing:
+            cache.add(key, _token(), conf()["TIMEOUT"])   # add(): concurrent readers settle on one token
+        found.update(cache.get_many(missing))
+    return [found.get(key, 0) for key in keys]
+
+async def aversions(user_id, scopes):
+    cache, keys = _cache(), [_key(user_id, scope) for scope in scopes]
+    found = await cache.aget_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        for key in missing:
+            await cache.aadd(key, _token(), conf()["TIMEOUT"])
+        found.update(await cache.aget_many(missing))
+    return [found.get(key, 0) for key in keys]
+
+def validators(name, request, tokens):
+    """
+    (etag, last_modified as a Unix timestamp) for view `name` given the counter
+    tokens; last_modified is None while the newest token is under a second old.
+    """
+    now = time.time()
+    newest = max(tokens, default=0) / 1e6
+    window = conf()["WINDOWS"].get(name)
+    parts = [name, str(request.user.pk), request.get_full_path(), *map(str, tokens)]
+    if window:
+        start = int(now // window * window)
+        parts.append(str(start))
+        newest = max(newest, start)
+    digest = hashlib.sha1("|".join(parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"', int(newest) if now - newest >= 1 else None
+
+def _stamp(response, etag, last_modified):
+    if response.status_code not in (200, 304):
+        return response
+    response.headers.setdefault("ETag", etag)
+    if last_modified is not None:
+        response.headers.setdefault("Last-Modified", http_date(last_modified))
+    patch_vary_headers(response, ["Authorization"])
+    patch_cache_control(response, private=True, no_cache=True)   # always revalidate, never share
+    return response
+
+def conditional(name, *scopes):
+    """
+    Decorator for GET handlers of authenticated views, DRF or async: answers
+    304 from the user's `scopes` counters, and stamps ETag / Last-Modified on
+    the full response.
+    """
+    def decorator(handler):
+        if asyncio.iscoroutinefunction(handler):
+            @wraps(handler)
+            async def wrapper(self, request, *args, **kwargs):
+                if not enabled():
+                    return await handler(self, request, *args, **kwargs)
+                etag, last_modified = validators(name, request, await aversions(request.user.pk, scopes))
+                response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if response is None:
+                    response = await handler(self, request, *args, **kwargs)
+                return _stamp(response, etag, last_modified)
+        else:
+            @wraps(handler)
+            def wrapper(self, request, *args, **kwargs):
+                if not enabled():
+                    return handler(self, request, *args, **kwargs)
+                etag, last_modified = validators(name, request, versions(request.user.pk, scopes))
+                response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if response is None:
+                    response = handler(self, request, *args, **kwargs)
+                return _stamp(response, etag, last_modified)
+        return wrapper
+    return decorator
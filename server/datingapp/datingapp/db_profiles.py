@@ -0,0 +1,110 @@
+# datingapp/db_profiles.py
+"""
+DATABASES["default"] per deployment profile, picked with the DB_PROFILE env var.
+
+- "sqlite" (default): the plain development database.
+- "sqlite-wal": single-node production on SQLite. WAL lets readers run while
+  a swipe is being written. BEGIN IMMEDIATE takes the write lock up front, so
+  writers queue on busy_timeout instead of failing with "database is locked"
+  mid-transaction. Connections are persistent so the pragmas are paid once.
+- "postgres": PostgreSQL via psycopg 3. POSTGRES_POOL=1 (default) uses
+  psycopg_pool's connection pool (psycopg[pool]); each connection is checked
+  before it is handed out. POSTGRES_POOL=0 uses persistent per-thread
+  connections instead (CONN_MAX_AGE + CONN_HEALTH_CHECKS), e.g. behind
+  PgBouncer. Django refuses both at once. psycopg is optional in
+  requirements.txt; without it (or without psycopg_pool when pooling) this
+  profile fails at startup with ImproperlyConfigured.
+
+replica_config() adds an optional read replica with the same profile
+(SQLITE_REPLICA_PATH or POSTGRES_REPLICA_HOST); datingapp/routers.py decides
+which reads may use it.
+"""
+import os
+from importlib.util import find_spec
+
+from django.core.exceptions import ImproperlyConfigured
+
+PROFILES = ("sqlite", "sqlite-wal", "postgres")
+
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL;"
+    "PRAGMA synchronous=NORMAL;"        # durable across app crashes; fsync at checkpoints
+    "PRAGMA busy_timeout=5000;"
+    "PRAGMA temp_store=MEMORY;"
+    "PRAGMA cache_size=-65536;"         # 64 MB page cache per connection
+    "PRAGMA mmap_size=268435456;"       # 256 MB memory-mapped reads
+)
+
+def _env_int(env, name, default):
+    return int(env.get(name, default))
+
+def _require(module, package):
+    if find_spec(module) is None:
+        raise ImproperlyConfigured(f'DB_PROFILE=postgres needs {module}: pip install "{package}"')
+
+def database_config(base_dir, env=os.environ):
+    profile = env.get("DB_PROFILE", "sqlite")
+    if profile not in PROFILES:
+        raise ValueError(f"DB_PROFILE must be one of {', '.join(PROFILES)}, not {profile!r}")
+
+    if profile.startswith("sqlite"):
+        db = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": env.get("SQLITE_PATH", base_dir / "db.sqlite3"),
+            # file-backed test DB: in-memory shared-cache SQLite fails concurrent
+            # writers with "table is locked" instead of waiting on the busy timeout
+            "TEST": {"NAME": base_dir / "test_db.sqlite3"},
+        }
+        if profile == "sqlite-wal":
+            db["OPTIONS"] = {
+                "init_command": SQLITE_PRAGMAS,
+                "transaction_mode": "IMMEDIATE",
+                "timeout": 20,
+            }
+            db["CONN_MAX_AGE"] = _env_int(env, "CONN_MAX_AGE", 600)
+            db["CONN_HEALTH_CHECKS"] = True
+        return db
+
+    pool = env.get("POSTGRES_POOL", "1") == "1"
+    _require("psycopg", "psycopg[binary,pool]" if pool else "psycopg[binary]")
+    if pool:
+        _require("psycopg_pool", "psycopg[pool]")
+    db = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": env.get("POSTGRES_DB", "datingapp"),
+        "USER": env.get("POSTGRES_USER", "datingapp"),
+        "PASSWORD": env.get("POSTGRES_PASSWORD", ""),
+        "HOST": env.get("POSTGRES_HOST", "localhost"),
+        "PORT": env.get("POSTGRES_PORT", "5432"),
+        "OPTIONS": {},
+    }
+    # with a pool, health checks become psycopg_pool's check_connection on checkout
+    db["CONN_HEALTH_CHECKS"] = True
+    if pool:
+        db["CONN_MAX_AGE"] = 0   # the pool keeps connections open, not Django
+        db["OPTIONS"]["pool"] = {
+            "min_size": _env_int(env, "POSTGRES_POOL_MIN", 2),
+            "max_size": _env_int(env, "POSTGRES_POOL_MAX", 20),
+            "timeout": _env_int(env, "POSTGRES_POOL_TIMEOUT", 10),   # seconds to wait for a free connection
+            "max_idle": 300,
+        }
+    else:
+        db["CONN_MAX_AGE"] = _env_int(env, "CONN_MAX_AGE", 60)
+    return db
+
+def replica_config(base_dir, env=os.environ):
+    """DATABASES["replica"] for the current profile, or None if no replica is configured."""
+    db = database_config(base_dir, env)
+    if db["ENGINE"].endswith("sqlite3"):
+        if not env.get("SQLITE_REPLICA_PATH"):
+            return None
+        db["NAME"] = env["SQLITE_REPLICA_PATH"]
+        # a separate test database, so tests can tell which alias served a read
+        db["TEST"] = {"NAME": base_dir / "test_replica.sqlite3"}
+        return db
+    if not env.get("POSTGRES_REPLICA_HOST"):
+        return None
+    db["HOST"] = env["POSTGRES_REPLICA_HOST"]
+    db["PORT"] = env.get("POSTGRES_REPLICA_PORT", db["PORT"])
+    db["TEST"] = {"MIRROR": "default"}   # tests have no replication: read the test primary
+    return db
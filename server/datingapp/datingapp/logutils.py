@@ -0,0 +1,147 @@
+# datingapp/logutils.py
+"""
+Structured, sampled request logging.
+
+- JsonFormatter renders one JSON object per line, including any `extra=` fields.
+- SampleFilter keeps a per-endpoint fraction of routine records (warnings and
+  errors always pass), so hot endpoints like swipe do not flood the log.
+- QueuedHandler hands records to a background thread that does the actual
+  I/O; the request thread only does a non-blocking queue put (records are
+  dropped, and counted, if the queue is full).
+- RequestLogMiddleware emits one "request" record per response.
+
+Nothing here ever logs secrets: use redact() on request payloads.
+"""
+import json, logging, queue, random, time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.module_loading import import_string
+
+SECRET_KEYS = {"password", "password2", "old_password", "new_password", "token", "access", "refresh"}
+REDACTED = "***"
+
+# attributes every LogRecord has; anything else came in through `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+request_logger = logging.getLogger("datingapp.request")
+
+def redact(data):
+    """Copy of a (Query)Dict / nested payload with secret values masked and files named."""
+    if hasattr(data, "lists"):   # QueryDict: keep single values flat
+        data = {k: v[0] if len(v) == 1 else v for k, v in data.lists()}
+    if isinstance(data, dict):
+        return {k: REDACTED if k.lower() in SECRET_KEYS else redact(v) for k, v in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [redact(v) for v in data]
+    if hasattr(data, "read"):    # UploadedFile
+        return f"<file {getattr(data, 'name', '?')} {getattr(data, 'size', '?')}B>"
+    return data
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        out = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        out.update((k, v) for k, v in vars(record).items() if k not in _RECORD_ATTRS)
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        return json.dumps(out, default=str, separators=(",", ":"))
+    # One JSON object per line; extra= fields become top-level keys
+
+class SampleFilter(logging.Filter):
+    """
+    Keep `rates[endpoint]` (else `default`) of INFO-and-below records, where
+    endpoint is the record's `endpoint` extra (the URL name). 1.0 keeps all,
+    0 drops all. WARNING and above are never sampled away.
+    """
+    def __init__(self, default=1.0, rates=None):
+        super().__init__()
+        self.default = default
+        self.rates = rates or {}
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(getattr(record, "endpoint", None), self.default)
+        return rate >= 1 or random.random() < rate
+
+class QueuedHandler(QueueHandler):
+    """
+    QueueHandler that owns its listener thread and target handler, so it can be
+    declared in LOGGING like any other handler:
+        {"()": "datingapp.logutils.QueuedHandler", "target": "logging.StreamHandler",
+         "formatter": "json", "maxsize": 10000}
+    The formatter runs on the listener thread, not in the request.
+    """
+    def __init__(self, target="logging.StreamHandler", maxsize=10000, **target_kwargs):
+        super().__init__(queue.Queue(maxsize))
+        self.target = import_string(target)(**target_kwargs)
+        self.dropped = 0
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=False)
+        self.listener.start()   # logging.shutdown() at exit closes us and flushes the queue
+
+    def setFormatter(self, fmt):
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # same process: pass the record itself, only pin the message (args may mutate)
+        record.msg, record.args = record.getMessage(), None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1   # never block a request on log I/O
+
+    def close(self):
+        if self.listener._thread is not None:
+            self.listener.stop()
+        self.target.close()
+        super().close()
+
+class RequestLogMiddleware:
+    """One structured record per request: endpoint, method, status, duration, user."""
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.log(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.log(request, response, started)
+        return response
+
+    @staticmethod
+    def log(request, response, started):
+        if request_logger.isEnabledFor(logging.INFO):
+            match = request.resolver_match
+            user = getattr(request, "user", None)   # DRF sets it on the request it wraps
+            request_logger.log(
+                logging.WARNING if response.status_code >= 500 else logging.INFO,
+                "%s %s %s", request.method, request.path, response.status_code,
+                extra={
+                    "endpoint": match.url_name if match else None,
+                    "method": request.method,
+                    "path": request.path,
+                    "status": response.status_code,
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                    "user_id": getattr(user, "pk", None),
+                },
+            )
@@ -0,0 +1,183 @@
+# datingapp/metrics.py
+"""
+Per-view request metrics, kept in process and exposed in Prometheus text format.
+
+MetricsMiddleware records for every request, labelled by URL name:
+- SQL query count and time spent in the database (a connection.execute_wrapper
+  that reports to the current request through a ContextVar, so queries that
+  async views run in sync_to_async threads are counted too)
+- render time: turning the DRF Response into bytes (JSON encoding)
+- total latency
+into fixed-bucket histograms. GET /api/metrics/ (staff only) returns them.
+
+settings.QUERY_BUDGETS = {url_name: max_queries} flags views that go over
+budget: a warning normally, QueryBudgetExceeded when QUERY_BUDGET_STRICT is on
+(QUERY_BUDGET_STRICT=1 in the environment, e.g. in CI, so a new N+1 fails tests).
+Counters are per process; with several workers each one reports its own.
+The middleware runs natively under both WSGI and ASGI.
+"""
+import logging, threading, time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from rest_framework import permissions
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+class Histogram:
+    """Cumulative-bucket histogram per label value (thread-safe)."""
+    def __init__(self, name, help, buckets):
+        self.name, self.help, self.buckets = name, help, buckets
+        self.series = {}   # label -> [bucket counts..., +Inf count, sum]
+        self.lock = threading.Lock()
+
+    def observe(self, label, value):
+        with self.lock:
+            row = self.series.get(label)
+            if row is None:
+                row = self.series[label] = [0] * (len(self.buckets) + 1) + [0.0]
+            row[bisect_left(self.buckets, value)] += 1
+            row[-1] += value
+
+    def snapshot(self, label):
+        with self.lock:
+            return list(self.series.get(label, ()))
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            series = {label: list(row) for label, row in self.series.items()}
+        for label, row in sorted(series.items()):
+            running = 0
+            for bound, n in zip(self.buckets + ("+Inf",), row[:-1]):
+                running += n
+                lines.append(f'{self.name}_bucket{{view="{label}",le="{bound}"}} {running}')
+            lines.append(f'{self.name}_sum{{view="{label}"}} {row[-1]:.6f}')
+            lines.append(f'{self.name}_count{{view="{label}"}} {running}')
+        return lines
+
+REQUEST_SECONDS = Histogram("dating_request_duration_seconds", "Total time spent handling the request.", SECONDS_BUCKETS)
+DB_SECONDS = Histogram("dating_db_duration_seconds", "Time spent executing SQL per request.", SECONDS_BUCKETS)
+DB_QUERIES = Histogram("dating_db_queries", "SQL queries issued per request.", QUERY_BUCKETS)
+RENDER_SECONDS = Histogram("dating_render_duration_seconds", "Time spent rendering (serializing) the response body.", SECONDS_BUCKETS)
+HISTOGRAMS = (REQUEST_SECONDS, DB_SECONDS, DB_QUERIES, RENDER_SECONDS)
+
+def render_prometheus():
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
+
+class _RequestStats:
+    __slots__ = ("queries", "db_seconds", "render_seconds", "render_started")
+
+    def __init__(self):
+        self.queries, self.db_seconds, self.render_seconds, self.render_started = 0, 0.0, 0.0, None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.queries += 1
+
+_current = ContextVar("request_metrics", default=None)
+
+def _record(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:   # management commands, background threads
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+def install(connection, **kwargs):
+    """Put the recording wrapper on a connection (idempotent; every new connection gets it)."""
+    if _record not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record)
+
+connection_created.connect(install)
+
+class MetricsMiddleware:
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        for conn in connections.all():   # connections opened before this module was imported
+            install(conn)
+        stats, token, started = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, stats, started)
+        return response
+
+    async def __acall__(self, request):
+        stats, token, started = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, stats, started)
+        return response
+
+    @staticmethod
+    def start(request):
+        stats = request._metrics = _RequestStats()
+        return stats, _current.set(stats), time.perf_counter()
+
+    def finish(self, request, stats, started):
+        elapsed = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.url_name if match and match.url_name else "unmatched"
+        REQUEST_SECONDS.observe(view, elapsed)
+        DB_SECONDS.observe(view, stats.db_seconds)
+        DB_QUERIES.observe(view, stats.queries)
+        RENDER_SECONDS.observe(view, stats.render_seconds)
+        self.check_budget(view, stats.queries)
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook returns
+        stats = request._metrics
+        stats.render_started = time.perf_counter()
+
+        def rendered(response):
+            stats.render_seconds = time.perf_counter() - stats.render_started
+        response.add_post_render_callback(rendered)
+        return response
+
+    @staticmethod
+    def check_budget(view, queries):
+        budget = getattr(settings, "QUERY_BUDGETS", {}).get(view)
+        if budget is None or queries <= budget:
+            return
+        message = f"{view} issued {queries} SQL queries (budget {budget})"
+        if getattr(settings, "QUERY_BUDGET_STRICT", False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message, extra={"endpoint": view, "queries": queries, "budget": budget})
+    # Query count, DB time, render time and latency per view into the histograms
+
+class MetricsView(APIView):
+    """Prometheus scrape target; staff only."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
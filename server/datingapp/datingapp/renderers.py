@@ -0,0 +1,44 @@
+# datingapp/renderers.py
+"""
+JSONRenderer on top of orjson, for the hot read endpoints.
+
+The bytes are the ones rest_framework's JSONRenderer produces with the default
+settings (compact, UTF-8, U+2028/U+2029 escaped); dates, decimals, UUIDs and
+the like still go through DRF's encoder. Only floats can differ (1e16 vs
+1e+16), and the feed and matches payloads carry none. Without orjson
+(pip install orjson), for indented output, or for anything orjson refuses
+(e.g. non-str keys, oversized ints), it is the stock renderer.
+"""
+try:
+    import orjson
+except ImportError:   # optional
+    orjson = None
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None or not self.compact or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_encoder.default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # JSONRenderer escapes these two for the sake of JavaScript
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+
+_encoder = JSONEncoder()
+
+def fast_renderer_classes(renderer_classes=None):
+    """
+    FastJSONRenderer in place of every JSONRenderer in `renderer_classes`
+    (default: DEFAULT_RENDERER_CLASSES), the other renderers kept in order.
+    """
+    if renderer_classes is None:
+        renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    return [FastJSONRenderer, *(r for r in renderer_classes if not issubclass(r, JSONRenderer))]
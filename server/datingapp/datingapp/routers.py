@@ -0,0 +1,86 @@
+# datingapp/routers.py
+"""
+Read-replica routing.
+
+With a "replica" alias in DATABASES (see db_profiles.replica_config), reads
+made while replica reads are switched on go to the replica; everything else,
+and every write, goes to "default".
+
+- ReplicaReadMixin turns replica reads on for GET requests of staleness-tolerant
+  views (feed, matches list).
+- pin_to_primary(user_id) sends that user's reads back to the primary for
+  REPLICA_PIN_SECONDS, so right after a swipe they read their own writes even
+  if the replica lags. Pins live in the default cache, which must be shared
+  between workers in production (see CACHES).
+
+The switch is a ContextVar, so it is per request under both WSGI threads and
+ASGI tasks. Without a replica alias all of this is a no-op.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA = "replica"
+
+_replica_reads = ContextVar("replica_reads", default=False)
+
+def replica_configured():
+    return REPLICA in connections.settings
+
+def _pin_key(user_id):
+    return f"db:pin:{user_id}"
+
+def pin_to_primary(user_id):
+    if replica_configured():
+        cache.set(_pin_key(user_id), 1, getattr(settings, "REPLICA_PIN_SECONDS", 10))
+
+def is_pinned(user_id):
+    return cache.get(_pin_key(user_id)) is not None
+
+async def ais_pinned(user_id):
+    return await cache.aget(_pin_key(user_id)) is not None
+
+@contextmanager
+def replica_reads(enabled=True):
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and replica_configured():
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        # explicit: an instance read from the replica must still be saved to the primary
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # both aliases hold the same data
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA}:
+            return True
+        return None
+    # Reads go to the replica only when the request asked for it
+
+class ReplicaReadMixin:
+    """DRF view mixin: GETs read from the replica unless the user was pinned to the primary."""
+    def dispatch(self, request, *args, **kwargs):
+        self._replica_token = None
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            # also on exceptions, or the switch would leak into the next request on this thread
+            if self._replica_token is not None:
+                _replica_reads.reset(self._replica_token)
+                self._replica_token = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)   # authentication reads the primary
+        if request.method in ("GET", "HEAD") and replica_configured() and not is_pinned(request.user.pk):
+            self._replica_token = _replica_reads.set(True)
@@ -13,6 +13,8 @@ from datetime import timedelta
 from pathlib import Path
 import os
 
+from .db_profiles import database_config, replica_config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -41,10 +43,12 @@ INSTALLED_APPS = [
     'rest_framework',
     'corsheaders',
     'dating',
-    'accounts'
+    'accounts',
+    'benchmark',
 ]
 
 MIDDLEWARE = [
+    'datingapp.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -53,6 +57,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'datingapp.logutils.RequestLogMiddleware',
 ]
 
 ROOT_URLCONF = 'datingapp.urls'
@@ -78,12 +83,118 @@ WSGI_APPLICATION = 'datingapp.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# DB_PROFILE=sqlite (default) | sqlite-wal | postgres, see datingapp/db_profiles.py
 DATABASES = {
+    'default': database_config(BASE_DIR),
+}
+if (replica := replica_config(BASE_DIR)):
+    DATABASES['replica'] = replica
+
+# Feed and matches reads may use the replica; swipers are pinned to the primary
+# for REPLICA_PIN_SECONDS afterwards (see datingapp/routers.py)
+DATABASE_ROUTERS = ['datingapp.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = 10
+
+
+# Cache
+# LocMemCache is per-process. Set REDIS_URL in production so every worker and
+# refill_candidate_queues share one cache; the candidate queue stays off on
+# LocMem (see dating/candidates.py).
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+if os.environ.get('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
     }
+
+# Precomputed swipe candidate queues (see dating/candidates.py)
+DATING_CANDIDATE_QUEUE = {
+    "CACHE": "default",        # cache alias holding the queues
+    "SIZE": 200,               # candidate ids kept per user
+    "TIMEOUT": 6 * 60 * 60,    # seconds before an unrefreshed queue expires
+    "ALLOW_LOCAL": False,      # use the queue even on a per-process LocMemCache
+}
+
+# Pre-rendered public profiles for feed and matches pages (see accounts/fragments.py)
+PROFILE_FRAGMENTS = {
+    "CACHE": "default",
+    "TIMEOUT": 60 * 60,   # seconds; user saves drop a profile's fragment sooner
+}
+
+# ETag / Last-Modified for me, matches and feed (see datingapp/conditional.py).
+# WINDOWS bounds how long a 304 may hide changes no per-user counter tracks
+# (other users' profiles, new signups), per view.
+CONDITIONAL_GET = {
+    "CACHE": "default",
+    "WINDOWS": {"feed": 60, "matches": 300},   # seconds
+    "ALLOW_LOCAL": False,   # off on a per-process LocMemCache: workers would answer stale 304s
+}
+
+# Feed ranking engine (see dating/recommend.py); the queue refill job and
+# /feed/?rank=recommended use it. "dating.recommend.IdOrderRecommender" = oldest first.
+DATING_RECOMMENDER = "dating.recommend.VectorizedRecommender"
+
+# Serve feed / swipe / matches with the async views in dating/async_views.py.
+# Only worth it under an ASGI server (uvicorn datingapp.asgi:application);
+# under WSGI keep the DRF views.
+DATING_ASYNC_VIEWS = os.environ.get("DATING_ASYNC_VIEWS") == "1"
+
+
+# Logging: JSON lines written by a background thread (see datingapp/logutils.py).
+# Routine request records are sampled per endpoint (URL name); warnings and errors
+# are always kept. Set ACCOUNTS_LOG_LEVEL=DEBUG to log (redacted) signup payloads.
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "json": {"()": "datingapp.logutils.JsonFormatter"},
+    },
+    "filters": {
+        "sample": {
+            "()": "datingapp.logutils.SampleFilter",
+            "default": float(os.environ.get("REQUEST_LOG_SAMPLE", "0.1")),
+            "rates": {"swipe": 0.01, "swipe-batch": 0.01, "feed": 0.01},
+        },
+    },
+    "handlers": {
+        "queued": {
+            "()": "datingapp.logutils.QueuedHandler",
+            "target": "logging.StreamHandler",
+            "formatter": "json",
+            "maxsize": 10000,
+        },
+    },
+    "loggers": {
+        "datingapp.request": {
+            "handlers": ["queued"],
+            "filters": ["sample"],
+            "level": os.environ.get("REQUEST_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+        "accounts": {
+            "handlers": ["queued"],
+            "level": os.environ.get("ACCOUNTS_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
+}
+
+
+# Per-view SQL query budgets (URL name -> max queries per request, auth included).
+# Over budget logs a warning; QUERY_BUDGET_STRICT=1 raises instead (see datingapp/metrics.py).
+QUERY_BUDGETS = {
+    "feed": 5,
+    "swipe": 5,
+    "swipe-batch": 5,
+    "matches": 3,
+    "me": 3,       # PATCH: row, update, like index
 }
+QUERY_BUDGET_STRICT = os.environ.get("QUERY_BUDGET_STRICT") == "1"
 
 
 # Password validation
@@ -104,6 +215,24 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing (see accounts/hashers.py). New passwords use PASSWORD_HASHER
+# ("scrypt", or "argon2" with `pip install argon2-cffi`); the other hashers are
+# kept to verify existing hashes, which are re-hashed on the user's next login.
+PASSWORD_HASHER = os.environ.get("PASSWORD_HASHER", "scrypt")
+_HASHERS = {
+    "scrypt": "accounts.hashers.TunedScryptPasswordHasher",
+    "argon2": "accounts.hashers.TunedArgon2PasswordHasher",
+    "pbkdf2": "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+}
+PASSWORD_HASHERS = [_HASHERS[PASSWORD_HASHER]] + [h for name, h in _HASHERS.items() if name != PASSWORD_HASHER]
+
+PASSWORD_HASHING = {
+    "SCRYPT_WORK_FACTOR": 2**15,   # 32 MiB, ~150 ms per hash on one core
+    "ARGON2_MEMORY_COST": 19456,   # KiB; time cost 2, parallelism 1
+    "WORKERS": int(os.environ.get("PASSWORD_HASH_WORKERS", os.cpu_count() or 1)),   # concurrent hashes per process
+    "QUEUE": 64,                   # waiting hashes before logins get 503
+}
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -125,10 +254,18 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Profile image uploads (see accounts/media.py)
+MEDIA_PIPELINE = {
+    "MAX_UPLOAD_BYTES": 5 * 1024 * 1024,       # enforced while the upload streams in
+    "VARIANTS": {"feed": 720, "thumb": 240},   # WebP variants: name -> longest edge (px)
+    "WEBP_QUALITY": 80,
+    "WORKERS": 2,                              # background encoder threads (0 = inline)
+}
+
 AUTH_USER_MODEL = "accounts.User"
 
 REST_FRAMEWORK = {
-    "DEFAULT_AUTHENTICATION_CLASSES": ("rest_framework_simplejwt.authentication.JWTAuthentication",),
+    "DEFAULT_AUTHENTICATION_CLASSES": ("accounts.authentication.ClaimsJWTAuthentication",),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
 }
 
@@ -136,6 +273,18 @@ SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
     "AUTH_HEADER_TYPES": ("Bearer",),
+    # access tokens carry profile claims, so requests skip the user query (accounts/authentication.py)
+    "TOKEN_OBTAIN_SERIALIZER": "accounts.authentication.ClaimsTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "accounts.authentication.ClaimsTokenRefreshSerializer",
+}
+
+# In-process cache of full user rows, for the fields token claims do not carry.
+# Claims are only trusted on a shared cache (REDIS_URL); on LocMem every request
+# loads the user, unless ALLOW_LOCAL.
+CLAIMS_AUTH = {
+    "USER_CACHE_SIZE": 10000,
+    "USER_CACHE_TTL": 30,   # seconds
+    "ALLOW_LOCAL": False,
 }
 
 # CORS settings
@@ -146,4 +295,7 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Let browser clients read the feed's keyset cursor and the ETags
+CORS_EXPOSE_HEADERS = ["X-Next-Cursor", "Link", "ETag"]
+
 CORS_ALLOW_ALL_ORIGINS = True  # Only for development
\ No newline at end of file
@@ -0,0 +1,15 @@
+# datingapp/sharedcache.py
+"""
+Whether a cache alias is shared by every process serving the site.
+
+Some state only works if every worker sees the same copy: the candidate queue,
+auth revocations and profile versions, conditional-GET counters. A write to a
+process-local LocMemCache stays in the worker that made it. Features built on
+that state switch themselves off on LocMem, or fall back to the database,
+unless their ALLOW_LOCAL setting says otherwise.
+"""
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+def is_shared(alias="default"):
+    return not isinstance(caches[alias], LocMemCache)
@@ -20,10 +20,13 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from .metrics import MetricsView
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include("accounts.urls")),
     path("api/dating/", include("dating.urls")),
+    path("api/metrics/", MetricsView.as_view(), name="metrics"),
 ]
 
 # serve uploaded files in dev